@@ -1,31 +1,44 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import google.generativeai as genai
 from agents.prompts import (
+    FOLLOW_UP_ANSWER_PROMPT,
     GLOBAL_ANSWER_PROMPT,
     SELECTED_TEXT_ANSWER_PROMPT,
     MODE_INSTRUCTIONS,
 )
+from utils.resilience import ResilientCaller
 
 
 class BookAgent:
     """Agent for answering questions about the book."""
 
-    def __init__(self, api_key: str, model: str = "gemini-1.5-flash"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-1.5-flash",
+        resilience: Optional[ResilientCaller] = None,
+    ):
         """
         Initialize the agent.
 
         Args:
             api_key: Google API key
             model: Gemini model to use
+            resilience: Retry/hedging policy for generation calls
         """
         # Configure genai only if not already configured
         if not hasattr(genai, '_configured') or not genai._configured:
             genai.configure(api_key=api_key)
             genai._configured = True
         self.model = genai.GenerativeModel(model)
+        self.resilience = resilience or ResilientCaller("generation")
 
     async def answer_with_context(
-        self, question: str, chunks: List[Dict], mode: str = "answer"
+        self,
+        question: str,
+        chunks: List[Dict],
+        mode: str = "answer",
+        history: Optional[str] = None,
     ) -> str:
         """
         Answer a question using retrieved context chunks.
@@ -34,6 +47,7 @@ class BookAgent:
             question: User's question
             chunks: Retrieved chunks with text and metadata
             mode: Query mode (answer, explain, summarize)
+            history: Compacted earlier turns of the chat session, if any
 
         Returns:
             Generated answer
@@ -42,25 +56,32 @@ class BookAgent:
         context = self._format_context(chunks)
 
         # Build prompt
-        prompt = GLOBAL_ANSWER_PROMPT.format(question=question, context=context)
+        if history:
+            prompt = FOLLOW_UP_ANSWER_PROMPT.format(
+                history=history, question=question, context=context
+            )
+        else:
+            prompt = GLOBAL_ANSWER_PROMPT.format(question=question, context=context)
 
         # Add mode-specific instruction
         if mode in MODE_INSTRUCTIONS:
             prompt += f"\n\n{MODE_INSTRUCTIONS[mode]}"
 
         # Generate answer with safety settings
-        response = self.model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=500,
-            ),
-            safety_settings={
-                "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
-                "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
-                "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
-                "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
-            }
+        response = await self.resilience.call(
+            lambda: self.model.generate_content_async(
+                prompt,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.7,
+                    max_output_tokens=500,
+                ),
+                safety_settings={
+                    "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+                    "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+                    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+                    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+                }
+            )
         )
 
         # Handle response safely
@@ -89,18 +110,20 @@ class BookAgent:
         )
 
         # Generate answer with safety settings
-        response = self.model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=500,
-            ),
-            safety_settings={
-                "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
-                "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
-                "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
-                "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
-            }
+        response = await self.resilience.call(
+            lambda: self.model.generate_content_async(
+                prompt,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.7,
+                    max_output_tokens=500,
+                ),
+                safety_settings={
+                    "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+                    "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+                    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+                    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+                }
+            )
         )
 
         # Handle response safely
@@ -129,7 +152,11 @@ class BookAgent:
         for i, chunk in enumerate(chunks, 1):
             text = chunk.get("text", "")
             metadata = chunk.get("metadata", {})
-            section = metadata.get("section", "Unknown section")
+            section = (
+                " > ".join(metadata.get("section_path") or [])
+                or metadata.get("section")
+                or "Unknown section"
+            )
 
             context_parts.append(f"[{i}] From {section}:\n{text}")
 
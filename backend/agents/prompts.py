@@ -12,6 +12,22 @@ Context:
 
 Answer clearly in 3-6 sentences."""
 
+FOLLOW_UP_ANSWER_PROMPT = """You are a helpful assistant answering questions about the book "AI-Driven & Spec-Driven Development Handbook".
+
+Use ONLY the context passages below from the book. The conversation so far is
+given to resolve follow-up questions; do not treat it as a source.
+
+Conversation so far:
+{history}
+
+Question:
+{question}
+
+Context:
+{context}
+
+Answer clearly in 3-6 sentences."""
+
 SELECTED_TEXT_ANSWER_PROMPT = """You are answering based ONLY on the selected text from the book "AI-Driven & Spec-Driven Development Handbook".
 
 Selected Text:
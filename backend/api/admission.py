@@ -0,0 +1,251 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    """Admission priority; lower values are served first."""
+
+    high = 0
+    normal = 1
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of being queued."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Headers telling the client when to try again."""
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded, priority-ordered wait queue."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 32,
+        max_wait_seconds: float = 10.0,
+    ):
+        """
+        Initialize the admission controller.
+
+        Args:
+            max_concurrency: Maximum number of generation calls in flight
+            max_queue: Maximum number of requests waiting for a slot
+            max_wait_seconds: Longest a request may wait before being shed
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+
+        self._active = 0
+        self._queued = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        # Exponentially weighted average of how long a slot is held
+        self._service_time = 1.0
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def estimated_wait(self, position: int) -> float:
+        """
+        Estimate how long a request at a queue position will wait.
+
+        Args:
+            position: 1-based position in the wait queue
+
+        Returns:
+            Estimated wait in seconds
+        """
+        return position * self._service_time / self.max_concurrency
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.normal):
+        """
+        Hold a generation slot for the duration of the block.
+
+        Args:
+            priority: Admission priority of the request
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait would exceed the deadline
+        """
+        await self._acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self._release()
+
+    async def _acquire(self, priority: Priority) -> None:
+        if self._active < self.max_concurrency and self._queued == 0:
+            self._active += 1
+            self.admitted += 1
+            return
+
+        if self._queued >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(
+                503,
+                "Server is at capacity, please retry later",
+                self.estimated_wait(self._queued),
+            )
+
+        estimated = self.estimated_wait(self._queued + 1)
+        if estimated > self.max_wait_seconds:
+            self.rejected_deadline += 1
+            raise AdmissionRejected(
+                503, "Server is at capacity, please retry later", estimated
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if future.done():
+                # The slot was handed over just as the deadline expired
+                self.admitted += 1
+                return
+            future.cancel()
+            self._queued -= 1
+            self.rejected_deadline += 1
+            raise AdmissionRejected(
+                503, "Timed out waiting for capacity", self._service_time
+            )
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # We own a slot that nobody will release
+                self._release()
+            else:
+                future.cancel()
+                self._queued -= 1
+            raise
+        self.admitted += 1
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.cancelled():
+                continue
+            # Hand the slot straight to the next waiter
+            self._queued -= 1
+            future.set_result(None)
+            return
+        self._active -= 1
+
+    def metrics(self) -> Dict[str, float]:
+        """Return counters and gauges describing admission state."""
+        return {
+            "active": self._active,
+            "queue_depth": self._queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_deadline": self.rejected_deadline,
+            "service_time_seconds": round(self._service_time, 4),
+        }
+
+
+class RateLimiter:
+    """Per-client token bucket rate limiter."""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_clients: int = 10000):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate_per_minute: Sustained requests allowed per client per minute
+            burst: Maximum requests a client may make back to back
+            max_clients: Number of client buckets tracked before evicting the oldest
+        """
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.limited = 0
+
+    def check(self, client_id: str) -> None:
+        """
+        Consume a token for a client.
+
+        Args:
+            client_id: Identifier of the calling client
+
+        Raises:
+            AdmissionRejected: If the client has exhausted its tokens
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client_id, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+
+        if tokens < 1.0:
+            self._buckets[client_id] = (tokens, now)
+            self._buckets.move_to_end(client_id)
+            self.limited += 1
+            raise AdmissionRejected(
+                429, "Rate limit exceeded", (1.0 - tokens) / self.rate
+            )
+
+        self._buckets[client_id] = (tokens - 1.0, now)
+        self._buckets.move_to_end(client_id)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+    def metrics(self) -> Dict[str, float]:
+        """Return rate limiting counters."""
+        return {"tracked_clients": len(self._buckets), "rate_limited": self.limited}
+
+
+def client_id_from(
+    host: Optional[str], forwarded_for: Optional[str], trusted_hops: int = 0
+) -> str:
+    """
+    Identify the calling client for rate limiting.
+
+    X-Forwarded-For is client-controlled except for the entries appended by
+    our own proxies, so it is only read when trusted_hops proxies sit in
+    front of the service, and then from the right.
+
+    Args:
+        host: Peer address of the connection
+        forwarded_for: Value of the X-Forwarded-For header, if any
+        trusted_hops: Number of trusted reverse proxies in front of the service
+
+    Returns:
+        Client identifier
+    """
+    if trusted_hops > 0 and forwarded_for:
+        addresses = [part.strip() for part in forwarded_for.split(",") if part.strip()]
+        if addresses:
+            return addresses[-min(trusted_hops, len(addresses))]
+    return host or "unknown"
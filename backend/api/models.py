@@ -1,7 +1,10 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from enum import Enum
 
+COLLECTION_NAME_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+SESSION_ID_PATTERN = r"^[A-Za-z0-9_-]{16,128}$"
+
 
 class QueryMode(str, Enum):
     """Query modes for the /query endpoint."""
@@ -16,6 +19,18 @@ class HealthResponse(BaseModel):
     detail: str
 
 
+class MetricsResponse(BaseModel):
+    """Operational counters for monitoring and autoscaling."""
+    admission: Dict[str, float]
+    rate_limiter: Dict[str, float]
+    response_cache: Dict[str, float]
+    embedding_cache: Dict[str, float]
+    collections: Dict[str, Dict[str, float]]
+    upstream: Dict[str, Dict[str, float]]
+    sessions: Dict[str, float]
+    query_log: Optional[Dict[str, float]] = None
+
+
 class IngestRequest(BaseModel):
     """Request body for the /ingest endpoint."""
     docs_path: str = Field(
@@ -23,12 +38,20 @@ class IngestRequest(BaseModel):
         description="Path to Docusaurus docs folder",
         example="../Ai-Spec-Driven/docs"
     )
+    collection: Optional[str] = Field(
+        None,
+        description="Collection (book) to ingest into; defaults to the configured collection",
+        pattern=COLLECTION_NAME_PATTERN,
+    )
 
 
 class IngestResponse(BaseModel):
     """Response body for the /ingest endpoint."""
     status: str
+    collection: str
     chunks_ingested: int
+    duplicates_skipped: int = 0
+    storage_bytes_saved: int = 0
 
 
 class Source(BaseModel):
@@ -38,11 +61,71 @@ class Source(BaseModel):
     score: float
 
 
+class SearchFilters(BaseModel):
+    """Optional metadata filters that scope retrieval."""
+    chapter: Optional[str] = Field(None, description="Only search this chapter")
+    section: Optional[str] = Field(None, description="Only search this section")
+    path_prefix: Optional[str] = Field(
+        None,
+        description="Only search files under this docs-relative directory",
+        example="getting-started",
+    )
+
+
 class QueryRequest(BaseModel):
     """Request body for the /query endpoint."""
     question: str = Field(..., description="Question to ask about the book")
     top_k: int = Field(5, description="Number of chunks to retrieve")
     mode: QueryMode = Field(QueryMode.answer, description="Query mode")
+    collection: Optional[str] = Field(
+        None,
+        description="Collection (book) to query; defaults to the configured collection",
+        pattern=COLLECTION_NAME_PATTERN,
+    )
+    filters: Optional[SearchFilters] = Field(
+        None, description="Metadata filters applied to retrieval"
+    )
+    current_page: Optional[str] = Field(
+        None,
+        description="Docs-relative path of the page the reader is on; its chunks are boosted",
+        example="getting-started/intro.md",
+    )
+    session_id: Optional[str] = Field(
+        None,
+        description=(
+            "Random chat session ID, e.g. a UUID; follow-up questions from the same "
+            "client see earlier turns of the session"
+        ),
+        pattern=SESSION_ID_PATTERN,
+    )
+
+
+class QueryParams(BaseModel):
+    """Query string of GET /query, the CDN-cacheable form of a stateless query."""
+    question: str = Field(..., description="Question to ask about the book")
+    top_k: int = Field(5, description="Number of chunks to retrieve")
+    mode: QueryMode = Field(QueryMode.answer, description="Query mode")
+    collection: Optional[str] = Field(None, pattern=COLLECTION_NAME_PATTERN)
+    chapter: Optional[str] = None
+    section: Optional[str] = None
+    path_prefix: Optional[str] = None
+    current_page: Optional[str] = None
+
+    def to_request(self) -> QueryRequest:
+        """Convert to the equivalent POST /query body."""
+        filters = None
+        if self.chapter or self.section or self.path_prefix:
+            filters = SearchFilters(
+                chapter=self.chapter, section=self.section, path_prefix=self.path_prefix
+            )
+        return QueryRequest(
+            question=self.question,
+            top_k=self.top_k,
+            mode=self.mode,
+            collection=self.collection,
+            filters=filters,
+            current_page=self.current_page,
+        )
 
 
 class QueryResponse(BaseModel):
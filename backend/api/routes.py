@@ -1,19 +1,54 @@
-from fastapi import APIRouter, HTTPException
+import json
+import time
+from typing import Annotated, Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from google.api_core.exceptions import ResourceExhausted
+from api.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    Priority,
+    RateLimiter,
+    client_id_from,
+)
 from api.models import (
     HealthResponse,
     IngestRequest,
     IngestResponse,
+    MetricsResponse,
+    QueryParams,
     QueryRequest,
     QueryResponse,
     QuerySelectedRequest,
     QuerySelectedResponse,
 )
-from rag.ingestor import Ingestor
-from rag.retriever import Retriever
+from api.sessions import Session, SessionStore, cosine_similarity
+from rag.dedup import NearDuplicateFilter
+from rag.registry import CollectionHandle, CollectionNotFound, CollectionRegistry
 from rag.embedder import Embedder
 from rag.chunker import ChunkingConfig
+from agents import prompts
 from agents.agent import BookAgent
 from utils.qdrant_client import get_qdrant_client
+from utils.query_log import QueryLogWriter, top_queries
+from utils.resilience import (
+    CircuitOpenError,
+    RequestDeadlineExceeded,
+    ResilientCaller,
+    deadline_scope,
+)
+from utils.response_cache import (
+    EmbeddingCache,
+    ResponseCache,
+    make_cache_key,
+    normalize_question,
+    hash_text,
+)
+from utils.shared_store import (
+    SharedEmbeddingCache,
+    SharedResponseCache,
+    SharedStore,
+    default_store_path,
+)
 from config import settings
 
 router = APIRouter()
@@ -21,36 +56,230 @@ router = APIRouter()
 # Global instances (initialized in main.py startup)
 qdrant_client = None
 embedder = None
-retriever = None
-ingestor = None
+collections = None
 agent = None
+response_cache = None
+admission = None
+rate_limiter = None
+query_log = None
+shared_store = None
+sessions = None
+answer_version = ""
 
 
 def initialize_components():
     """Initialize all components on startup."""
-    global qdrant_client, embedder, retriever, ingestor, agent
+    global qdrant_client, embedder, collections, agent, response_cache
+    global admission, rate_limiter, query_log, shared_store, sessions, answer_version
+
+    # Workers share caches through one store so nothing is warmed twice
+    if settings.shared_cache_path or settings.workers > 1:
+        shared_store = SharedStore(settings.shared_cache_path or default_store_path())
 
     qdrant_client = get_qdrant_client(settings.qdrant_url, settings.qdrant_api_key)
     embedder = Embedder(
         api_key=settings.google_api_key,
         model=settings.embedding_model,
         batch_size=settings.embedding_batch_size,
-    )
-    retriever = Retriever(
-        qdrant_client=qdrant_client, collection_name=settings.collection_name
+        resilience=_resilient_caller("embedding", settings.hedge_embeddings),
+        cache=(
+            SharedEmbeddingCache(shared_store, settings.embedding_cache_size)
+            if shared_store
+            else EmbeddingCache(settings.embedding_cache_size)
+        ),
     )
     chunking_config = ChunkingConfig(
         chunk_size=settings.chunk_size_chars,
         overlap=settings.chunk_overlap_chars,
         min_chunk_size=settings.min_chunk_chars,
+        structure_aware=settings.structure_aware_chunking,
+        max_tokens=settings.chunk_max_tokens,
+        min_tokens=settings.chunk_min_tokens,
+        overlap_tokens=settings.chunk_overlap_tokens,
     )
-    ingestor = Ingestor(
+    collections = CollectionRegistry(
         qdrant_client=qdrant_client,
         embedder=embedder,
         chunking_config=chunking_config,
-        collection_name=settings.collection_name,
+        max_collections=settings.max_active_collections,
+        idle_seconds=settings.collection_idle_seconds,
+        response_cache_size=settings.response_cache_size,
+        response_cache_ttl_seconds=settings.response_cache_ttl_seconds,
+        shared_store=shared_store,
+        dedup=(
+            NearDuplicateFilter(threshold=settings.dedup_threshold)
+            if settings.dedup_enabled
+            else None
+        ),
+    )
+    answer_version = _answer_version()
+    agent = BookAgent(
+        api_key=settings.google_api_key,
+        model=settings.llm_model,
+        resilience=_resilient_caller("generation", settings.hedge_generation),
+    )
+    # Selected-text answers do not depend on any collection, so they share one cache
+    if shared_store:
+        response_cache = SharedResponseCache(
+            shared_store,
+            namespace="query-selected",
+            max_size=settings.response_cache_size,
+            ttl_seconds=settings.response_cache_ttl_seconds,
+        )
+    else:
+        response_cache = ResponseCache(
+            max_size=settings.response_cache_size,
+            ttl_seconds=settings.response_cache_ttl_seconds,
+        )
+    admission = AdmissionController(
+        max_concurrency=settings.max_concurrent_generations,
+        max_queue=settings.admission_queue_size,
+        max_wait_seconds=settings.admission_max_wait_seconds,
+    )
+    rate_limiter = RateLimiter(
+        rate_per_minute=settings.rate_limit_per_minute,
+        burst=settings.rate_limit_burst,
+    )
+    sessions = SessionStore(
+        max_sessions=settings.max_sessions, ttl_seconds=settings.session_ttl_seconds
+    )
+    if settings.query_log_path:
+        query_log = QueryLogWriter(settings.query_log_path)
+
+
+def _answer_version() -> str:
+    """
+    Fingerprint everything that shapes an answer besides the question.
+
+    Cached answers outlive restarts in the shared store, so the model, the
+    prompt templates and the response schemas are part of every cache key.
+
+    Returns:
+        Hex digest identifying the current answer format
+    """
+    templates = {
+        name: value for name, value in vars(prompts).items() if name.isupper()
+    }
+    return make_cache_key(
+        settings.llm_model,
+        json.dumps(templates, sort_keys=True),
+        json.dumps(QueryResponse.model_json_schema(), sort_keys=True),
+        json.dumps(QuerySelectedResponse.model_json_schema(), sort_keys=True),
+    )
+
+
+def _resilient_caller(name: str, hedge: bool) -> ResilientCaller:
+    """Build the retry/hedging policy for one upstream from settings."""
+    return ResilientCaller(
+        name,
+        max_retries=settings.upstream_max_retries,
+        hedge=hedge,
+        failure_threshold=settings.upstream_failure_threshold,
+        reset_seconds=settings.upstream_reset_seconds,
+    )
+
+
+def _set_cache_headers(
+    response: Response, etag: str, cache_hit: bool, shared: bool = False
+) -> None:
+    """
+    Attach cache validation headers to an answer.
+
+    Args:
+        response: Response to add headers to
+        etag: ETag of the answer
+        cache_hit: Whether the answer came from the response cache
+        shared: Allow CDNs and other shared caches to store the answer; only
+            GET responses are cacheable by them
+    """
+    response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+    response.headers["ETag"] = etag
+    if shared:
+        response.headers["Cache-Control"] = (
+            f"public, max-age={settings.response_cache_ttl_seconds}"
+        )
+    else:
+        response.headers["Cache-Control"] = "private, no-cache"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header (RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _not_modified(
+    http_request: Request, etag: str, cache_hit: bool
+) -> Optional[Response]:
+    """Return a 304 response if a GET client already holds this answer."""
+    if not _etag_matches(http_request.headers.get("if-none-match"), etag):
+        return None
+    not_modified = Response(status_code=304)
+    _set_cache_headers(not_modified, etag, cache_hit, shared=True)
+    return not_modified
+
+
+def _log_query(
+    endpoint: str, request, started: float, status: int, cache_hit: bool
+) -> None:
+    """Queue a query log entry if query logging is enabled."""
+    if query_log is None:
+        return
+    entry = request.model_dump(mode="json", exclude_none=True)
+    entry.update(
+        ts=time.time(),
+        endpoint=endpoint,
+        status=status,
+        cache="hit" if cache_hit else "miss",
+        latency_ms=round((time.perf_counter() - started) * 1000, 1),
     )
-    agent = BookAgent(api_key=settings.google_api_key, model=settings.llm_model)
+    query_log.record(entry)
+
+
+def _collection_name(requested: Optional[str]) -> str:
+    """Resolve the collection a request targets, defaulting to the configured book."""
+    return requested or settings.collection_name
+
+
+def _client_id(http_request: Request) -> str:
+    """Identify the caller for per-client rate limiting."""
+    host = http_request.client.host if http_request.client else None
+    return client_id_from(
+        host, http_request.headers.get("x-forwarded-for"), settings.trusted_proxy_hops
+    )
+
+
+OVERLOAD_ERRORS = (
+    AdmissionRejected,
+    ResourceExhausted,
+    CircuitOpenError,
+    RequestDeadlineExceeded,
+)
+
+
+def _overload_error(e: Exception) -> HTTPException:
+    """Map shedding and upstream failures to a fast retryable response."""
+    if isinstance(e, RequestDeadlineExceeded):
+        return HTTPException(status_code=504, detail=str(e))
+    if isinstance(e, CircuitOpenError):
+        e = AdmissionRejected(503, str(e), e.retry_after)
+    elif not isinstance(e, AdmissionRejected):
+        e = AdmissionRejected(
+            503,
+            f"Upstream model quota exhausted: {str(e)}",
+            settings.admission_max_wait_seconds,
+        )
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
 
 
 @router.get("/health", response_model=HealthResponse)
@@ -59,67 +288,370 @@ async def health_check():
     return HealthResponse(status="ok", detail="service running")
 
 
+@router.get("/metrics", response_model=MetricsResponse)
+async def metrics():
+    """Expose admission, rate limiting and cache counters for autoscaling."""
+    return MetricsResponse(
+        admission=admission.metrics(),
+        rate_limiter=rate_limiter.metrics(),
+        response_cache=response_cache.metrics(),
+        embedding_cache=embedder.cache.metrics(),
+        collections=collections.metrics(),
+        upstream={
+            "embedding": embedder.resilience.metrics(),
+            "generation": agent.resilience.metrics(),
+        },
+        sessions=sessions.metrics(),
+        query_log=query_log.metrics() if query_log else None,
+    )
+
+
 @router.post("/ingest", response_model=IngestResponse)
 async def ingest_book(request: IngestRequest):
     """
     Ingest book markdown files into the vector database.
 
     Reads markdown files from the specified path, chunks them,
-    generates embeddings, and uploads to Qdrant.
+    generates embeddings, and uploads to the requested collection.
     """
     try:
-        chunks_count = await ingestor.ingest_documents(request.docs_path)
-        return IngestResponse(status="success", chunks_ingested=chunks_count)
+        handle = collections.get(_collection_name(request.collection), create=True)
+        result = await handle.ingestor.ingest_documents(request.docs_path)
+        return IngestResponse(
+            status="success",
+            collection=handle.name,
+            chunks_ingested=result.chunks_ingested,
+            duplicates_skipped=result.duplicates_skipped,
+            storage_bytes_saved=result.storage_bytes_saved,
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
 
 
 @router.post("/query", response_model=QueryResponse)
-async def query_book(request: QueryRequest):
+async def query_book(request: QueryRequest, http_request: Request, response: Response):
     """
     Query the book using global RAG.
 
     Retrieves relevant chunks from the vector database and
-    generates an answer using the OpenAI agent.
+    generates an answer using the OpenAI agent. Identical questions
+    are served from the response cache without touching Gemini or Qdrant.
+    Follow-ups in a chat session see the earlier turns and are never cached.
+    """
+    return await _serve_query(request, http_request, response, conditional=False)
+
+
+@router.get("/query", response_model=QueryResponse)
+async def query_book_get(
+    params: Annotated[QueryParams, Query()], http_request: Request, response: Response
+):
+    """
+    Query the book using global RAG through a cacheable GET.
+
+    Same as POST /query without sessions. Responses may be stored by CDNs,
+    and a matching If-None-Match returns 304 Not Modified.
     """
+    return await _serve_query(
+        params.to_request(), http_request, response, conditional=True
+    )
+
+
+async def _serve_query(
+    request: QueryRequest, http_request: Request, response: Response, conditional: bool
+):
+    """
+    Answer a /query request and set its cache headers.
+
+    Args:
+        request: Query request
+        http_request: Incoming HTTP request
+        response: Response whose headers are set
+        conditional: Honor If-None-Match and allow shared caching (GET only)
+
+    Returns:
+        QueryResponse, or a 304 response
+    """
+    started = time.perf_counter()
+    status, cache_hit = 500, False
     try:
-        # Generate embedding for the question
-        question_embedding = embedder.embed_single(request.question)
-
-        # Retrieve relevant chunks
-        results = retriever.search(
-            query_vector=question_embedding,
-            top_k=request.top_k,
-            score_threshold=settings.score_threshold,
+        query_response, etag, cache_hit = await _answer_query(
+            request, _client_id(http_request)
         )
+        if etag is None:
+            response.headers["Cache-Control"] = "no-store"
+            status = 200
+            return query_response
+        if conditional:
+            not_modified = _not_modified(http_request, etag, cache_hit)
+            if not_modified is not None:
+                status = not_modified.status_code
+                return not_modified
+        _set_cache_headers(response, etag, cache_hit, shared=conditional)
+        status = 200
+        return query_response
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        _log_query("/query", request, started, status, cache_hit)
 
-        # Generate answer using the agent
-        answer = await agent.answer_with_context(
-            question=request.question, chunks=results, mode=request.mode.value
+
+@router.post("/query-selected", response_model=QuerySelectedResponse)
+async def query_selected_text(
+    request: QuerySelectedRequest, http_request: Request, response: Response
+):
+    """
+    Query based only on user-selected text.
+
+    Uses only the provided selected text as context,
+    without performing vector search.
+    """
+    started = time.perf_counter()
+    status, cache_hit = 500, False
+    try:
+        selected_response, etag, cache_hit = await _answer_selected(
+            request, _client_id(http_request)
         )
+        _set_cache_headers(response, etag, cache_hit)
+        status = 200
+        return selected_response
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        _log_query("/query-selected", request, started, status, cache_hit)
+
+
+async def _answer_query(
+    request: QueryRequest, client_id: Optional[str]
+) -> Tuple[QueryResponse, Optional[str], bool]:
+    """
+    Answer a global RAG query, from the response cache when possible.
+
+    Within a chat session, a follow-up close to the previous question reuses
+    that turn's chunks instead of searching Qdrant again.
+
+    Args:
+        request: Query request
+        client_id: Caller to rate limit, or None for internal callers
+
+    Returns:
+        Tuple of (response, etag, cache hit); the etag is None for answers
+        that depend on session history and must not be cached
+    """
+    try:
+        handle = collections.get(_collection_name(request.collection))
+    except CollectionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    # Opening a session stores state even when the answer is cached, so the
+    # caller is rate limited first; random session IDs cannot flush the store
+    rate_checked = False
+    session = None
+    if request.session_id:
+        if client_id is not None:
+            try:
+                rate_limiter.check(client_id)
+            except AdmissionRejected as e:
+                raise _overload_error(e)
+            rate_checked = True
+        session = sessions.open(client_id or "internal", request.session_id)
+    history = session.history(settings.session_history_tokens) if session else ""
+    context_key = make_cache_key(
+        handle.name,
+        request.top_k,
+        request.filters.model_dump_json() if request.filters else "",
+        request.current_page or "",
+        handle.ingestor.collection_version,
+    )
+
+    # Only answers that do not depend on earlier turns can be shared
+    cache_key = make_cache_key(
+        "query",
+        answer_version,
+        normalize_question(request.question),
+        request.mode.value,
+        context_key,
+    )
+    cached = None if history else handle.response_cache.get(cache_key)
+    if cached is not None:
+        payload, etag = cached
+        if session is not None:
+            session.record(
+                request.question,
+                payload["answer"],
+                settings.session_max_turns,
+                context_key=context_key,
+            )
+        return QueryResponse(**payload), etag, True
+
+    try:
+        if client_id is not None and not rate_checked:
+            rate_limiter.check(client_id)
+        with deadline_scope(settings.request_deadline_seconds):
+            async with admission.slot(Priority.normal):
+                # Generate embedding for the question
+                question_embedding = await embedder.embed_single(request.question)
+
+                # Retrieve relevant chunks, reusing the last turn's when close enough
+                results = None
+                if session is not None:
+                    await _restore_pending_retrieval(
+                        session, handle, request, question_embedding, context_key
+                    )
+                    results = session.reusable_chunks(
+                        question_embedding,
+                        context_key,
+                        settings.session_reuse_similarity,
+                    )
+                if results is not None:
+                    sessions.reused_retrievals += 1
+                else:
+                    results = _search(handle, request, question_embedding)
+                    if session is not None:
+                        sessions.fresh_retrievals += 1
+                        # Vague follow-ups often retrieve nothing on their own
+                        if not results and session.context_key == context_key:
+                            results = session.chunks
+
+                # Generate answer using the agent
+                answer = await agent.answer_with_context(
+                    question=request.question,
+                    chunks=results,
+                    mode=request.mode.value,
+                    history=history or None,
+                )
 
         # Format sources
-        sources = retriever.format_sources(results)
+        sources = handle.retriever.format_sources(results)
 
-        return QueryResponse(answer=answer, sources=sources)
+        query_response = QueryResponse(answer=answer, sources=sources)
+        if session is not None:
+            session.record(
+                request.question,
+                answer,
+                settings.session_max_turns,
+                embedding=question_embedding,
+                chunks=results,
+                context_key=context_key,
+            )
+        if history:
+            return query_response, None, False
+        etag = handle.response_cache.set(cache_key, query_response.model_dump())
+        return query_response, etag, False
+    except OVERLOAD_ERRORS as e:
+        raise _overload_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
-@router.post("/query-selected", response_model=QuerySelectedResponse)
-async def query_selected_text(request: QuerySelectedRequest):
+def _search(
+    handle: CollectionHandle, request: QueryRequest, query_vector: List[float]
+) -> List[Dict]:
+    """Retrieve chunks for a query request from its collection."""
+    return handle.retriever.search(
+        query_vector=query_vector,
+        top_k=request.top_k,
+        score_threshold=settings.score_threshold,
+        boost_path=request.current_page,
+        boost=settings.current_page_boost,
+        **(request.filters.model_dump() if request.filters else {}),
+    )
+
+
+async def _restore_pending_retrieval(
+    session: Session,
+    handle: CollectionHandle,
+    request: QueryRequest,
+    question_embedding: List[float],
+    context_key: str,
+) -> None:
     """
-    Query based only on user-selected text.
+    Retrieve for a last turn that was answered from the response cache.
 
-    Uses only the provided selected text as context,
-    without performing vector search.
+    Only done when the follow-up is close enough to reuse it. The earlier
+    question's embedding normally comes from the embedding cache, so this costs
+    the one search the cached turn skipped.
+
+    Args:
+        session: Chat session of the follow-up
+        handle: Collection the follow-up queries
+        request: Follow-up query request
+        question_embedding: Embedding of the follow-up question
+        context_key: Identifies the collection, filters and top_k of the follow-up
     """
+    question = session.pending_question
+    session.pending_question = None
+    if question is None or session.context_key != context_key:
+        return
+    previous = await embedder.embed_single(question)
+    if cosine_similarity(previous, question_embedding) < settings.session_reuse_similarity:
+        return
+    session.restore_retrieval(previous, _search(handle, request, previous))
+
+
+async def _answer_selected(
+    request: QuerySelectedRequest, client_id: Optional[str]
+) -> Tuple[QuerySelectedResponse, str, bool]:
+    """
+    Answer a question about selected text, from the response cache when possible.
+
+    Args:
+        request: Selected-text query request
+        client_id: Caller to rate limit, or None for internal callers
+
+    Returns:
+        Tuple of (response, etag, cache hit)
+    """
+    cache_key = make_cache_key(
+        "query-selected",
+        answer_version,
+        normalize_question(request.question),
+        hash_text(request.selected_text),
+    )
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        payload, etag = cached
+        return QuerySelectedResponse(**payload), etag, True
+
     try:
-        answer = await agent.answer_from_selection(
-            question=request.question, selected_text=request.selected_text
-        )
-        return QuerySelectedResponse(answer=answer)
+        if client_id is not None:
+            rate_limiter.check(client_id)
+        with deadline_scope(settings.request_deadline_seconds):
+            # Selection questions are interactive, so they jump ahead of bulk traffic
+            async with admission.slot(Priority.high):
+                answer = await agent.answer_from_selection(
+                    question=request.question, selected_text=request.selected_text
+                )
+        selected_response = QuerySelectedResponse(answer=answer)
+        etag = response_cache.set(cache_key, selected_response.model_dump())
+        return selected_response, etag, False
+    except OVERLOAD_ERRORS as e:
+        raise _overload_error(e)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Selected text query failed: {str(e)}"
         )
+
+
+async def prewarm_from_query_log(top_n: int) -> int:
+    """
+    Answer the most frequent logged questions to fill the response caches.
+
+    Args:
+        top_n: Number of distinct requests to pre-answer
+
+    Returns:
+        Number of requests answered
+    """
+    answered = 0
+    for endpoint, body in top_queries(settings.query_log_path, top_n):
+        try:
+            if endpoint == "/query":
+                await _answer_query(QueryRequest(**body), client_id=None)
+            else:
+                await _answer_selected(QuerySelectedRequest(**body), client_id=None)
+            answered += 1
+        except Exception as e:
+            print(f"Warning: Could not pre-warm {endpoint} {body.get('question')!r}: {e}")
+    return answered
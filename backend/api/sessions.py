@@ -0,0 +1,200 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from rag.chunker import estimate_tokens
+
+
+def cosine_similarity(a, b) -> float:
+    """Cosine similarity of two vectors; 0 if either is all zeros."""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    norms = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b) / norms if norms else 0.0
+
+
+@dataclass
+class Turn:
+    """One question and answer in a chat session."""
+
+    question: str
+    answer: str
+
+
+@dataclass
+class Session:
+    """Conversation state kept between turns of one chat session."""
+
+    session_id: str
+    turns: List[Turn] = field(default_factory=list)
+    # Retrieval of the last turn, reused by close follow-up questions
+    embedding: Optional[np.ndarray] = None
+    chunks: List[Dict] = field(default_factory=list)
+    context_key: str = ""
+    # Set when the last turn was served from the response cache, which keeps
+    # no retrieval; it is recomputed only if a close follow-up needs it
+    pending_question: Optional[str] = None
+    last_used: float = field(default_factory=time.monotonic)
+
+    def reusable_chunks(
+        self, embedding: List[float], context_key: str, min_similarity: float
+    ) -> Optional[List[Dict]]:
+        """
+        Return the last turn's chunks if a new question is close enough to it.
+
+        Args:
+            embedding: Embedding of the new question
+            context_key: Identifies the collection, filters and top_k of the new query
+            min_similarity: Cosine similarity required to reuse the chunks
+
+        Returns:
+            Previously retrieved chunks, or None if they should not be reused
+        """
+        if self.embedding is None or not self.chunks or context_key != self.context_key:
+            return None
+        if cosine_similarity(embedding, self.embedding) < min_similarity:
+            return None
+        return self.chunks
+
+    def restore_retrieval(self, embedding: List[float], chunks: List[Dict]) -> None:
+        """
+        Fill in the retrieval of a last turn that was served from the cache.
+
+        Args:
+            embedding: Embedding of the last turn's question
+            chunks: Chunks retrieved for it
+        """
+        self.embedding = np.asarray(embedding, dtype=np.float32)
+        self.chunks = chunks
+        self.pending_question = None
+
+    def record(
+        self,
+        question: str,
+        answer: str,
+        max_turns: int,
+        embedding: Optional[List[float]] = None,
+        chunks: Optional[List[Dict]] = None,
+        context_key: str = "",
+    ) -> None:
+        """
+        Append a turn and remember its retrieval for the next one.
+
+        Args:
+            question: User's question
+            answer: Generated answer
+            max_turns: Turns kept; older ones are dropped
+            embedding: Embedding of the question; None when the answer came from
+                the response cache without retrieval
+            chunks: Chunks the answer was generated from
+            context_key: Identifies the collection, filters and top_k of the query
+        """
+        self.turns.append(Turn(question=question, answer=answer))
+        del self.turns[:-max_turns]
+        self.context_key = context_key
+        if embedding is None:
+            self.embedding = None
+            self.chunks = []
+            self.pending_question = question
+        else:
+            # float32 keeps a 768-dimension vector at 3 KB per session
+            self.embedding = np.asarray(embedding, dtype=np.float32)
+            self.chunks = chunks or []
+            self.pending_question = None
+
+    def history(self, budget_tokens: int) -> str:
+        """
+        Render recent turns for the prompt within a token budget.
+
+        The newest turns are kept verbatim. Older turns shrink to the question
+        and the first sentence of the answer, and are dropped once even that no
+        longer fits.
+
+        Args:
+            budget_tokens: Maximum estimated tokens of the rendered history
+
+        Returns:
+            History text, oldest turn first; empty if there are no turns
+        """
+        lines: List[str] = []
+        remaining = budget_tokens
+        verbatim = True
+        for turn in reversed(self.turns):
+            entry = f"User: {turn.question}\nAssistant: {turn.answer}"
+            if not verbatim or estimate_tokens(len(entry)) > remaining:
+                verbatim = False
+                summary = turn.answer.split(". ", 1)[0].strip()
+                entry = f"User: {turn.question}\nAssistant (summary): {summary}"
+            cost = estimate_tokens(len(entry))
+            if cost > remaining:
+                break
+            lines.append(entry)
+            remaining -= cost
+        return "\n\n".join(reversed(lines))
+
+
+class SessionStore:
+    """Bounded in-memory chat sessions with TTL and LRU eviction."""
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800):
+        """
+        Initialize the store.
+
+        Args:
+            max_sessions: Maximum sessions kept before evicting the least recently used
+            ttl_seconds: Idle time after which a session expires
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[Tuple[str, str], Session]" = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.reused_retrievals = 0
+        self.fresh_retrievals = 0
+
+    def open(self, client_id: str, session_id: str) -> Session:
+        """
+        Get a session, starting a new one if it does not exist or has expired.
+
+        Sessions are keyed by caller as well as ID, so another client sending
+        the same session ID gets a session of its own rather than this one.
+
+        Args:
+            client_id: Caller the session belongs to
+            session_id: Client-chosen session identifier
+
+        Returns:
+            The session
+        """
+        self._evict_expired()
+        key = (client_id, session_id)
+        session = self._sessions.get(key)
+        if session is None:
+            session = Session(session_id=session_id)
+            self._sessions[key] = session
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(key)
+        return session
+
+    def metrics(self) -> Dict[str, float]:
+        """Return session counts and how often retrieval was reused."""
+        return {
+            "active": len(self._sessions),
+            "created": self.created,
+            "expired": self.expired,
+            "reused_retrievals": self.reused_retrievals,
+            "fresh_retrievals": self.fresh_retrievals,
+        }
+
+    def _evict_expired(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
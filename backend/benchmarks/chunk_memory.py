@@ -0,0 +1,164 @@
+"""Peak-RSS comparison of the legacy dict-based ingest path and the offset-based one.
+
+Each path runs in its own subprocess against the same synthetic corpus, with a
+fake embedder and a Qdrant client that discards upserts, so only the ingest
+pipeline's own memory is measured.
+
+Usage:
+    python -m benchmarks.chunk_memory [--files 400] [--file-kb 40] [--dim 768]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import uuid
+from typing import List
+from qdrant_client.models import PointStruct
+from rag.chunker import Chunker, ChunkingConfig
+from rag.ingestor import Ingestor
+from utils.file_loader import load_markdown_files
+
+
+class FakeEmbedder:
+    """Returns random vectors shaped like real embeddings."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def get_embedding_dimension(self) -> int:
+        return self.dim
+
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        return [[random.random() for _ in range(self.dim)] for _ in texts]
+
+
+class DiscardingClient:
+    """Stands in for Qdrant and drops every upsert."""
+
+    def upsert(self, collection_name, points):
+        pass
+
+
+def write_corpus(path: str, files: int, file_kb: int) -> None:
+    words = ["spec", "agent", "model", "prompt", "context", "test", "design", "review"]
+    for i in range(files):
+        chapter = os.path.join(path, f"chapter-{i % 20}")
+        os.makedirs(chapter, exist_ok=True)
+        body = " ".join(random.choice(words) for _ in range(file_kb * 150))
+        with open(os.path.join(chapter, f"page-{i}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# Page {i}\n\n{body}\n")
+
+
+async def ingest_legacy(docs_path: str, embedder: FakeEmbedder) -> int:
+    """The pre-offset pipeline: dict per chunk, then all embeddings and points at once."""
+    chunker = Chunker(ChunkingConfig())
+    client = DiscardingClient()
+    all_chunks = []
+    for file_info in load_markdown_files(docs_path, extensions=[".md", ".mdx"]):
+        metadata = chunker.extract_metadata(file_info["file_path"], file_info["content"])
+        metadata["relative_path"] = file_info["relative_path"]
+        all_chunks.extend(chunker.chunk_text(file_info["content"], metadata))
+
+    texts = [chunk["text"] for chunk in all_chunks]
+    embeddings = await embedder.embed_texts(texts)
+    points = [
+        PointStruct(
+            id=str(uuid.uuid4()),
+            vector=embedding,
+            payload={"text": chunk["text"], "metadata": chunk["metadata"]},
+        )
+        for chunk, embedding in zip(all_chunks, embeddings)
+    ]
+    for i in range(0, len(points), 100):
+        client.upsert(collection_name="bench", points=points[i : i + 100])
+    return len(all_chunks)
+
+
+async def ingest_offsets(docs_path: str, embedder: FakeEmbedder) -> int:
+    ingestor = Ingestor(
+        qdrant_client=DiscardingClient(),
+        embedder=embedder,
+        # Same sliding window as the legacy path, so both produce the same chunks
+        chunking_config=ChunkingConfig(structure_aware=False),
+        collection_name="bench",
+    )
+    result = await ingestor.ingest_documents(docs_path)
+    return result.chunks_ingested
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_mode(mode: str, docs_path: str, dim: int) -> None:
+    baseline = peak_rss_mb()
+    ingest = ingest_legacy if mode == "legacy" else ingest_offsets
+    chunks = asyncio.run(ingest(docs_path, FakeEmbedder(dim)))
+    print(
+        json.dumps(
+            {
+                "mode": mode,
+                "chunks": chunks,
+                "peak_rss_mb": peak_rss_mb(),
+                "baseline_rss_mb": baseline,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ingest peak memory")
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--file-kb", type=int, default=40)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--mode", choices=["legacy", "offsets"], help=argparse.SUPPRESS)
+    parser.add_argument("--docs", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.docs, args.dim)
+        return
+
+    with tempfile.TemporaryDirectory() as docs_path:
+        random.seed(0)
+        write_corpus(docs_path, args.files, args.file_kb)
+
+        results = {}
+        for mode in ("legacy", "offsets"):
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.chunk_memory",
+                    "--mode",
+                    mode,
+                    "--docs",
+                    docs_path,
+                    "--dim",
+                    str(args.dim),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    legacy = results["legacy"]["peak_rss_mb"] - results["legacy"]["baseline_rss_mb"]
+    offsets = results["offsets"]["peak_rss_mb"] - results["offsets"]["baseline_rss_mb"]
+    print(f"Chunks:           {results['offsets']['chunks']}")
+    print(f"Legacy peak:      {results['legacy']['peak_rss_mb']:.1f} MB (+{legacy:.1f} MB)")
+    print(f"Offsets peak:     {results['offsets']['peak_rss_mb']:.1f} MB (+{offsets:.1f} MB)")
+    if legacy > 0:
+        print(f"Ingest reduction: {100 * (1 - offsets / legacy):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
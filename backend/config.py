@@ -14,14 +14,65 @@ class Settings(BaseSettings):
     embedding_model: str = "models/text-embedding-004"
     embedding_batch_size: int = 16
 
+    # Multi-collection serving
+    max_active_collections: int = 32
+    collection_idle_seconds: int = 1800
+
     # Retrieval configuration
     top_k_default: int = 5
     score_threshold: float = 0.2
+    current_page_boost: float = 0.1
+
+    # Response cache configuration
+    response_cache_size: int = 1024
+    response_cache_ttl_seconds: int = 3600
+    embedding_cache_size: int = 10000
+
+    # Multi-worker deployment; caches move to a shared SQLite store when
+    # a path is set or more than one worker is configured
+    workers: int = 1
+    shared_cache_path: Optional[str] = None
+
+    # Admission control configuration
+    max_concurrent_generations: int = 8
+    admission_queue_size: int = 32
+    admission_max_wait_seconds: float = 10.0
+    rate_limit_per_minute: float = 30.0
+    rate_limit_burst: int = 10
+    # Reverse proxies in front of the service whose X-Forwarded-For entries are trusted
+    trusted_proxy_hops: int = 0
+
+    # Upstream resilience configuration
+    request_deadline_seconds: float = 30.0
+    upstream_max_retries: int = 2
+    upstream_failure_threshold: int = 5
+    upstream_reset_seconds: float = 30.0
+    hedge_embeddings: bool = True
+    hedge_generation: bool = False
+
+    # Chat sessions (in memory, per worker)
+    max_sessions: int = 1000
+    session_ttl_seconds: float = 1800
+    session_max_turns: int = 10
+    session_history_tokens: int = 600
+    session_reuse_similarity: float = 0.8
+
+    # Query log configuration (disabled unless a path is set)
+    query_log_path: Optional[str] = None
+    query_log_prewarm_top_n: int = 0
 
     # Chunking configuration
     chunk_size_chars: int = 1000
     chunk_overlap_chars: int = 200
     min_chunk_chars: int = 300
+    structure_aware_chunking: bool = True
+    chunk_max_tokens: int = 400
+    chunk_min_tokens: int = 100
+    chunk_overlap_tokens: int = 50
+
+    # Near-duplicate chunk elimination at ingest
+    dedup_enabled: bool = True
+    dedup_threshold: float = 0.85
 
     # Gemini model
     llm_model: str = "gemini-2.5-flash"
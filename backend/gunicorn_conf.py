@@ -0,0 +1,33 @@
+"""Gunicorn configuration for the multi-worker production deployment.
+
+Usage:
+    WORKERS=4 gunicorn -c gunicorn_conf.py main:app
+
+The app is imported once in the master before workers fork, so modules and
+other read-only data are shared copy-on-write. Clients and caches are created
+per worker on startup; caches live in a shared SQLite store (on /dev/shm when
+available) so every worker sees what any other worker has cached.
+"""
+
+import gc
+import multiprocessing
+import os
+
+workers = int(os.environ.get("WORKERS", multiprocessing.cpu_count()))
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+# Must be set before the app (and its settings) are imported by preload_app
+os.environ["WORKERS"] = str(workers)
+if workers > 1 and not os.environ.get("SHARED_CACHE_PATH"):
+    from utils.shared_store import default_store_path
+
+    os.environ["SHARED_CACHE_PATH"] = default_store_path()
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the GC's reach so collections in
+    # workers do not touch, and therefore copy, the shared pages
+    gc.freeze()
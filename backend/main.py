@@ -1,9 +1,9 @@
+import asyncio
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import router, initialize_components
-from utils.qdrant_client import initialize_collection
+from api.routes import router, initialize_components, prewarm_from_query_log
 from config import settings
-from rag.embedder import Embedder
 
 app = FastAPI(
     title="Book RAG Chatbot API",
@@ -29,13 +29,24 @@ async def startup_event():
     # Initialize all components
     initialize_components()
 
-    # Initialize Qdrant collection if needed
-    from api.routes import qdrant_client, embedder
+    # Initialize the default Qdrant collection if needed
+    from api.routes import collections
 
-    if qdrant_client and embedder:
-        vector_size = embedder.get_embedding_dimension()
-        initialize_collection(
-            qdrant_client, settings.collection_name, vector_size
+    if collections:
+        collections.get(settings.collection_name, create=True)
+
+    # Pre-answer the most frequent logged questions in the background; with
+    # shared caches one worker warms them for all
+    from api.routes import shared_store
+
+    if (
+        settings.query_log_prewarm_top_n > 0
+        and settings.query_log_path
+        and os.path.exists(settings.query_log_path)
+        and (shared_store is None or shared_store.claim("prewarm", 600))
+    ):
+        app.state.prewarm_task = asyncio.create_task(
+            prewarm_from_query_log(settings.query_log_prewarm_top_n)
         )
 
     print("Startup complete!")
@@ -46,6 +57,11 @@ async def shutdown_event():
     """Cleanup on shutdown."""
     print("Shutting down...")
 
+    from api.routes import query_log
+
+    if query_log:
+        query_log.close()
+
 
 # Include API routes
 app.include_router(router)
@@ -1,6 +1,20 @@
+from array import array
 from dataclasses import dataclass
-from typing import List, Dict
-import re
+from typing import List, Dict, Iterator, Optional, Tuple
+
+# Rough characters-per-token ratio for English prose and code
+CHARS_PER_TOKEN = 4
+
+# Block kinds produced by markdown_blocks
+HEADING = "heading"
+FENCE = "fence"
+TABLE = "table"
+COMPONENT = "component"
+TEXT = "text"
+FRONTMATTER = "frontmatter"
+
+# Blocks that are never split, even when larger than a chunk
+ATOMIC_BLOCKS = (FENCE, TABLE, COMPONENT)
 
 
 @dataclass
@@ -10,10 +24,311 @@ class ChunkingConfig:
     chunk_size: int = 1000
     overlap: int = 200
     min_chunk_size: int = 300
+    structure_aware: bool = True
+    max_tokens: int = 400
+    min_tokens: int = 100
+    overlap_tokens: int = 50
+
+
+def estimate_tokens(chars: int) -> int:
+    """Estimate the token count of a span from its length in characters."""
+    return (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def parse_heading(line: str) -> Optional[Tuple[int, str]]:
+    """
+    Parse an ATX heading line.
+
+    Args:
+        line: Line with surrounding whitespace stripped
+
+    Returns:
+        Tuple of (level, title), or None if the line is not a heading
+    """
+    level = 0
+    while level < len(line) and line[level] == "#":
+        level += 1
+    if not 1 <= level <= 6 or (level < len(line) and line[level] != " "):
+        return None
+
+    title = line[level:].strip().rstrip("#").strip()
+    # Docusaurus custom heading ids: "## Title {#title-id}"
+    anchor = title.rfind(" {#")
+    if anchor != -1 and title.endswith("}"):
+        title = title[:anchor].rstrip()
+    return level, title
+
+
+def _component_name(line: str) -> Optional[str]:
+    # MDX components start with an uppercase tag, e.g. <Tabs> or <Admonition type="tip">
+    if len(line) < 2 or line[0] != "<" or not line[1].isupper():
+        return None
+    end = 1
+    while end < len(line) and (line[end].isalnum() or line[end] in "._"):
+        end += 1
+    return line[1:end]
+
+
+def _common_prefix(a: Tuple[str, ...], b: Tuple[str, ...]) -> Tuple[str, ...]:
+    length = 0
+    while length < min(len(a), len(b)) and a[length] == b[length]:
+        length += 1
+    return a[:length]
+
+
+def _frontmatter_end(text: str, start: int) -> int:
+    # Frontmatter needs a closing "---" line; without one the opening line is
+    # just a horizontal rule
+    pos = start
+    while True:
+        close = text.find("\n---", pos - 1)
+        if close == -1:
+            return -1
+        line_end = text.find("\n", close + 1)
+        line_end = len(text) if line_end == -1 else line_end + 1
+        if text[close + 1 : line_end].strip() == "---":
+            return line_end
+        pos = close + 2
+
+
+def markdown_blocks(text: str) -> Iterator[Tuple[str, int, int, int, str]]:
+    """
+    Split markdown into top-level blocks in a single pass over its lines.
+
+    Fenced code, tables and MDX components are returned whole; paragraphs and
+    lists run until a blank line or the start of another block.
+
+    Args:
+        text: Markdown source
+
+    Yields:
+        (kind, start, end, heading level, heading title); level and title are
+        only set for headings
+    """
+    length = len(text)
+    pos = 0
+    kind = None
+    block_start = 0
+    fence = ""
+    component = ""
+    depth = 0
+
+    while pos < length:
+        newline = text.find("\n", pos)
+        line_end = length if newline == -1 else newline + 1
+        line = text[pos:line_end].strip()
+
+        if kind == FENCE:
+            # A closing fence is at least as long as the opening one
+            if line.startswith(fence) and not line.strip(fence[0]):
+                yield FENCE, block_start, line_end, 0, ""
+                kind = None
+            pos = line_end
+            continue
+
+        if kind == COMPONENT:
+            depth += line.count("<" + component + " ") + line.count("<" + component + ">")
+            depth -= line.count("</" + component + ">")
+            if depth <= 0:
+                yield COMPONENT, block_start, line_end, 0, ""
+                kind = None
+            pos = line_end
+            continue
+
+        if kind == TABLE:
+            if line.startswith("|"):
+                pos = line_end
+                continue
+            yield TABLE, block_start, pos, 0, ""
+            kind = None
+
+        # Lines that start a new block end any paragraph in progress
+        heading = parse_heading(line) if line.startswith("#") else None
+        opens_fence = line.startswith("```") or line.startswith("~~~")
+        name = _component_name(line)
+        starts_block = (
+            not line
+            or heading is not None
+            or opens_fence
+            or line.startswith("|")
+            or name is not None
+        )
+        if kind == TEXT and starts_block:
+            yield TEXT, block_start, pos, 0, ""
+            kind = None
+
+        if kind == TEXT or not line:
+            pos = line_end
+            continue
+
+        if pos == 0 and line == "---":
+            frontmatter_end = _frontmatter_end(text, line_end)
+            if frontmatter_end != -1:
+                yield FRONTMATTER, 0, frontmatter_end, 0, ""
+                pos = frontmatter_end
+                continue
+
+        block_start = pos
+        if heading is not None:
+            yield HEADING, pos, line_end, heading[0], heading[1]
+        elif opens_fence:
+            marker = line[0]
+            count = 0
+            while count < len(line) and line[count] == marker:
+                count += 1
+            fence = marker * count
+            kind = FENCE
+        elif line.startswith("|"):
+            kind = TABLE
+        elif name is not None:
+            component = name
+            depth = line.count("<" + name + " ") + line.count("<" + name + ">")
+            depth -= line.count("</" + name + ">")
+            if line.endswith("/>") or depth <= 0:
+                yield COMPONENT, pos, line_end, 0, ""
+            else:
+                kind = COMPONENT
+        else:
+            kind = TEXT
+        pos = line_end
+
+    # Unterminated fences and components run to the end of the text
+    if kind is not None:
+        yield kind, block_start, length, 0, ""
+
+
+class ChunkIndex:
+    """
+    Compact store of chunks as (document, start, end) offsets into source texts.
+
+    Chunk text is only sliced out when requested, so a corpus is never copied
+    into per-chunk strings and dicts all at once.
+    """
+
+    __slots__ = (
+        "documents",
+        "metadata",
+        "doc_ids",
+        "starts",
+        "ends",
+        "sections",
+        "section_ids",
+        "_section_lookup",
+    )
+
+    def __init__(self):
+        self.documents: List[str] = []
+        self.metadata: List[Dict] = []
+        self.doc_ids = array("I")
+        self.starts = array("I")
+        self.ends = array("I")
+        # Heading paths are interned; chunks store an index into sections
+        self.sections: List[Tuple[str, ...]] = [()]
+        self.section_ids = array("I")
+        self._section_lookup: Dict[Tuple[str, ...], int] = {(): 0}
+
+    def add_document(self, text: str, metadata: Dict) -> int:
+        """
+        Register a source document.
+
+        Args:
+            text: Full document text
+            metadata: Metadata shared by all chunks of the document
+
+        Returns:
+            Index of the document
+        """
+        self.documents.append(text)
+        self.metadata.append(metadata)
+        return len(self.documents) - 1
+
+    def add_chunk(
+        self, doc_id: int, start: int, end: int, section: Tuple[str, ...] = ()
+    ) -> None:
+        """
+        Register a chunk of a document.
+
+        Args:
+            doc_id: Index of the source document
+            start: Start offset of the chunk in the document
+            end: End offset of the chunk in the document
+            section: Heading path of the chunk, outermost heading first
+        """
+        section_id = self._section_lookup.get(section)
+        if section_id is None:
+            section_id = len(self.sections)
+            self.sections.append(section)
+            self._section_lookup[section] = section_id
+        self.doc_ids.append(doc_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.section_ids.append(section_id)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def text(self, i: int) -> str:
+        return self.documents[self.doc_ids[i]][self.starts[i] : self.ends[i]]
+
+    def texts(self, start: int, stop: int) -> List[str]:
+        """
+        Materialize the text of a range of chunks.
+
+        Args:
+            start: First chunk index
+            stop: Chunk index to stop before
+
+        Returns:
+            Chunk texts
+        """
+        return [self.text(i) for i in range(start, min(stop, len(self)))]
+
+    def chunk_metadata(self, i: int) -> Dict:
+        """
+        Get a chunk's metadata, with its own heading path if it has one.
+
+        Args:
+            i: Chunk index
+
+        Returns:
+            Metadata dictionary
+        """
+        metadata = self.metadata[self.doc_ids[i]]
+        section = self.sections[self.section_ids[i]]
+        if not section:
+            return metadata
+        return {
+            **metadata,
+            "heading": section[-1],
+            "section": section[-1],
+            "section_path": list(section),
+        }
+
+    def select(self, positions: List[int]) -> "ChunkIndex":
+        """
+        Build an index holding only some chunks, sharing the source documents.
+
+        Args:
+            positions: Chunk indexes to keep, in order
+
+        Returns:
+            New ChunkIndex
+        """
+        selected = ChunkIndex()
+        selected.documents = self.documents
+        selected.metadata = self.metadata
+        for i in positions:
+            selected.add_chunk(
+                self.doc_ids[i],
+                self.starts[i],
+                self.ends[i],
+                self.sections[self.section_ids[i]],
+            )
+        return selected
 
 
 class Chunker:
-    """Handles document chunking with sliding window strategy."""
+    """Handles document chunking by markdown structure or with a sliding window."""
 
     def __init__(self, config: ChunkingConfig):
         self.config = config
@@ -29,14 +344,179 @@ class Chunker:
         Returns:
             List of chunk dictionaries with text and metadata
         """
-        chunks = []
+        return [
+            {"text": text[start:end], "metadata": metadata or {}}
+            for start, end in self.chunk_spans(text)
+        ]
+
+    def index_text(self, index: ChunkIndex, text: str, metadata: Dict) -> int:
+        """
+        Chunk text into a ChunkIndex without copying chunk strings.
+
+        Uses the structure-aware chunker unless it is disabled in the config.
+
+        Args:
+            index: Index to add the document and its chunks to
+            text: The text to chunk
+            metadata: Metadata shared by all chunks of the text
+
+        Returns:
+            Number of chunks added
+        """
+        if self.config.structure_aware:
+            spans = self.section_spans(text)
+        else:
+            spans = ((start, end, ()) for start, end in self.chunk_spans(text))
+
+        doc_id = None
+        count = 0
+        for start, end, section in spans:
+            if doc_id is None:
+                doc_id = index.add_document(text, metadata)
+            index.add_chunk(doc_id, start, end, section)
+            count += 1
+        return count
+
+    def section_spans(self, text: str) -> Iterator[Tuple[int, int, Tuple[str, ...]]]:
+        """
+        Compute chunk boundaries that follow the markdown structure.
+
+        Every heading starts a new chunk, except that a section smaller than
+        min_tokens runs on into a following sibling or child section; such a
+        chunk is labeled with the heading path the merged sections share.
+        Within a section, blocks are packed into chunks of up to max_tokens
+        estimated tokens; code blocks, tables and MDX components are never
+        split, and oversized paragraphs are cut at line or word boundaries.
+        When a section needs several chunks, a short trailing block is repeated
+        at the start of the next one as overlap.
+
+        Args:
+            text: Markdown text to chunk
+
+        Yields:
+            (start, end, heading path) of each chunk
+
+        Example:
+            >>> chunker = Chunker(ChunkingConfig())
+            >>> list(chunker.section_spans("Intro.\\n\\n# Top\\n\\nShort.\\n"))
+            [(0, 7, ()), (8, 22, ('Top',))]
+        """
+        max_tokens = self.config.max_tokens
+        headings: List[Tuple[int, str]] = []
+        chunk_start = None
+        chunk_end = 0
+        chunk_tokens = 0
+        chunk_path: Tuple[str, ...] = ()
+        # Size of the current section, heading included, however it was chunked
+        section_tokens = 0
+        # Content blocks in the current chunk, and the most recent one
+        blocks = 0
+        last_start = last_end = 0
+
+        for kind, start, end, level, title in markdown_blocks(text):
+            if kind == FRONTMATTER:
+                continue
+
+            if kind == HEADING:
+                # Small sections run on into a sibling or child section, but not
+                # into a parent's next section, and text before the first
+                # heading stays unlabeled on its own. The short tail of a large
+                # section is not a small section and keeps its own chunk.
+                merge = (
+                    blocks > 0
+                    and bool(headings)
+                    and chunk_tokens < self.config.min_tokens
+                    and section_tokens < self.config.min_tokens
+                    and level >= headings[-1][0]
+                )
+                if blocks and not merge:
+                    yield chunk_start, chunk_end, chunk_path
+                    chunk_start, chunk_tokens, blocks = None, 0, 0
+                while headings and headings[-1][0] >= level:
+                    headings.pop()
+                headings.append((level, title))
+                path = tuple(t for _, t in headings)
+                if merge:
+                    chunk_path = _common_prefix(chunk_path, path)
+                else:
+                    # Consecutive headings stay together at the top of the next chunk
+                    chunk_path = path
+                if chunk_start is None:
+                    chunk_start = start
+                chunk_end = end
+                section_tokens = estimate_tokens(end - start)
+                chunk_tokens += section_tokens
+                continue
+
+            if kind in ATOMIC_BLOCKS:
+                pieces = [(start, end)]
+            else:
+                pieces = self._split_block(text, start, end)
+
+            for piece_start, piece_end in pieces:
+                tokens = estimate_tokens(piece_end - piece_start)
+                if (
+                    blocks
+                    and chunk_tokens + tokens > max_tokens
+                    and chunk_tokens >= self.config.min_tokens
+                ):
+                    yield chunk_start, chunk_end, chunk_path
+                    chunk_path = tuple(t for _, t in headings)
+                    overlap = estimate_tokens(last_end - last_start)
+                    if blocks > 1 and overlap <= self.config.overlap_tokens:
+                        chunk_start, chunk_tokens, blocks = last_start, overlap, 1
+                    else:
+                        chunk_start, chunk_tokens, blocks = None, 0, 0
+
+                if chunk_start is None:
+                    chunk_start = piece_start
+                    chunk_path = tuple(t for _, t in headings)
+                chunk_end = piece_end
+                chunk_tokens += tokens
+                section_tokens += tokens
+                blocks += 1
+                last_start, last_end = piece_start, piece_end
+
+        # A trailing heading with no content is not worth a chunk
+        if blocks:
+            yield chunk_start, chunk_end, chunk_path
+
+    def _split_block(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        # Cut paragraphs larger than a chunk at the last line break, sentence
+        # end or space that fits, in that order of preference
+        max_chars = self.config.max_tokens * CHARS_PER_TOKEN
+        pieces = []
+        while end - start > max_chars:
+            limit = start + max_chars
+            for separator in ("\n", ". ", " "):
+                cut = text.rfind(separator, start, limit)
+                if cut > start:
+                    cut += len(separator)
+                    break
+            else:
+                cut = limit
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+        return pieces
+
+    def chunk_spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Compute sliding window chunk boundaries.
+
+        Args:
+            text: The text to chunk
+
+        Yields:
+            (start, end) character offsets of each chunk
+        """
         text_length = len(text)
 
         # If text is shorter than min chunk size, return as single chunk
         if text_length < self.config.min_chunk_size:
             if text.strip():  # Only return if not empty
-                chunks.append({"text": text, "metadata": metadata or {}})
-            return chunks
+                yield 0, text_length
+            return
 
         start = 0
         while start < text_length:
@@ -44,19 +524,15 @@ class Chunker:
 
             # Don't create chunks smaller than min_chunk_size
             if end >= text_length:
-                chunk_text = text[start:]
-                if len(chunk_text) >= self.config.min_chunk_size or start == 0:
-                    chunks.append({"text": chunk_text, "metadata": metadata or {}})
+                if text_length - start >= self.config.min_chunk_size or start == 0:
+                    yield start, text_length
                 break
 
-            chunk_text = text[start:end]
-            chunks.append({"text": chunk_text, "metadata": metadata or {}})
+            yield start, end
 
             # Move start position with overlap
             start += self.config.chunk_size - self.config.overlap
 
-        return chunks
-
     def extract_metadata(self, file_path: str, content: str) -> Dict:
         """
         Extract metadata from markdown file.
@@ -75,11 +551,17 @@ class Chunker:
             "section": "",
         }
 
-        # Extract first heading (# or ##)
-        heading_match = re.search(r"^#{1,2}\s+(.+)$", content, re.MULTILINE)
-        if heading_match:
-            metadata["heading"] = heading_match.group(1).strip()
-            metadata["section"] = heading_match.group(1).strip()
+        if self.config.structure_aware:
+            # Chunks carry their own heading path; text before the first heading
+            # belongs to no section rather than to the heading that follows it
+            metadata["section_path"] = []
+        else:
+            # Extract first heading (# or ##) outside code blocks
+            for kind, _, _, level, title in markdown_blocks(content):
+                if kind == HEADING and level <= 2:
+                    metadata["heading"] = title
+                    metadata["section"] = title
+                    break
 
         # Try to extract chapter from file path or heading
         # Assuming structure like "docs/chapter-name/section.md"
@@ -0,0 +1,145 @@
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List
+import numpy as np
+from rag.chunker import ChunkIndex
+
+# Mersenne prime for the universal hash family; with hashes and coefficients
+# below 2^32 and 2^29 the products stay inside uint64
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+@dataclass
+class DedupResult:
+    """Outcome of near-duplicate elimination over a chunk index."""
+
+    index: ChunkIndex
+    duplicates_removed: int = 0
+    text_bytes_saved: int = 0
+    # Canonical chunk position in the returned index -> other source locations
+    locations: Dict[int, List[Dict]] = field(default_factory=dict)
+
+
+class NearDuplicateFilter:
+    """MinHash signatures with LSH banding to drop near-duplicate chunks in one pass."""
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        bands: int = 8,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        """
+        Initialize the filter.
+
+        Args:
+            threshold: Estimated Jaccard similarity at which chunks count as duplicates
+            num_perm: Number of MinHash permutations
+            bands: LSH bands; num_perm must be divisible by it
+            shingle_size: Words per shingle
+            seed: Seed for the hash permutations, fixed so runs are reproducible
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 29, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 29, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Compute the MinHash signature of a text.
+
+        Args:
+            text: Chunk text
+
+        Returns:
+            Array of num_perm minimum hash values
+        """
+        words = text.lower().split()
+        if len(words) <= self.shingle_size:
+            shingles = [" ".join(words)]
+        else:
+            shingles = [
+                " ".join(words[i : i + self.shingle_size])
+                for i in range(len(words) - self.shingle_size + 1)
+            ]
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+    def filter(self, index: ChunkIndex) -> DedupResult:
+        """
+        Keep one canonical chunk per group of near-duplicates.
+
+        Each chunk is compared only with the first chunk seen in its LSH buckets,
+        so the pass stays linear in the number of chunks.
+
+        Args:
+            index: Chunks to deduplicate
+
+        Returns:
+            DedupResult with the reduced index and the removed chunks' locations
+        """
+        buckets: Dict[bytes, int] = {}
+        signatures: Dict[int, np.ndarray] = {}
+        keep: List[int] = []
+        canonical_of: Dict[int, int] = {}
+        result = DedupResult(index=index)
+
+        for i in range(len(index)):
+            text = index.text(i)
+            sig = self.signature(text)
+            keys = [
+                band.to_bytes(2, "little")
+                + sig[band * self.rows : (band + 1) * self.rows].tobytes()
+                for band in range(self.bands)
+            ]
+
+            duplicate_of = None
+            for key in keys:
+                candidate = buckets.get(key)
+                if candidate is not None and (
+                    np.mean(signatures[candidate] == sig) >= self.threshold
+                ):
+                    duplicate_of = candidate
+                    break
+
+            if duplicate_of is None:
+                canonical_of[i] = len(keep)
+                keep.append(i)
+                signatures[i] = sig
+                for key in keys:
+                    buckets.setdefault(key, i)
+                continue
+
+            position = canonical_of[duplicate_of]
+            result.locations.setdefault(position, []).append(self._location(index, i))
+            result.duplicates_removed += 1
+            result.text_bytes_saved += len(text.encode("utf-8"))
+
+        if result.duplicates_removed:
+            result.index = index.select(keep)
+        return result
+
+    @staticmethod
+    def _location(index: ChunkIndex, i: int) -> Dict:
+        metadata = index.chunk_metadata(i)
+        return {
+            "file_path": metadata.get("file_path", ""),
+            "relative_path": metadata.get("relative_path", ""),
+            "chapter": metadata.get("chapter", ""),
+            "section": metadata.get("section", ""),
+            "offset": index.starts[i],
+        }
@@ -1,11 +1,20 @@
-from typing import List
+from typing import List, Optional
 import google.generativeai as genai
+from utils.resilience import ResilientCaller
+from utils.response_cache import EmbeddingCache, make_cache_key
 
 
 class Embedder:
     """Handles text embedding generation using Google Gemini."""
 
-    def __init__(self, api_key: str, model: str = "models/text-embedding-004", batch_size: int = 16):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "models/text-embedding-004",
+        batch_size: int = 16,
+        resilience: Optional[ResilientCaller] = None,
+        cache=None,
+    ):
         """
         Initialize the embedder.
 
@@ -13,6 +22,8 @@ class Embedder:
             api_key: Google API key
             model: Embedding model name
             batch_size: Number of texts to embed in a single batch
+            resilience: Retry/hedging policy for embedding calls
+            cache: Query embedding cache; an in-process cache is used by default
         """
         # Configure genai only if not already configured
         if not hasattr(genai, '_configured') or not genai._configured:
@@ -20,8 +31,10 @@ class Embedder:
             genai._configured = True
         self.model = model
         self.batch_size = batch_size
+        self.resilience = resilience or ResilientCaller("embedding", hedge=True)
+        self.cache = cache if cache is not None else EmbeddingCache()
 
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings for multiple texts in batches.
 
@@ -35,17 +48,20 @@ class Embedder:
 
         for i in range(0, len(texts), self.batch_size):
             batch = texts[i : i + self.batch_size]
-            # Gemini embed_content can handle batches
-            result = genai.embed_content(
-                model=self.model,
-                content=batch,
-                task_type="retrieval_document"
+            # Gemini embed_content can handle batches; bulk ingest is not hedged
+            result = await self.resilience.call(
+                lambda: genai.embed_content_async(
+                    model=self.model,
+                    content=batch,
+                    task_type="retrieval_document"
+                ),
+                hedge=False,
             )
             all_embeddings.extend(result["embedding"])
 
         return all_embeddings
 
-    def embed_single(self, text: str) -> List[float]:
+    async def embed_single(self, text: str) -> List[float]:
         """
         Generate embedding for a single text.
 
@@ -55,11 +71,19 @@ class Embedder:
         Returns:
             Embedding vector
         """
-        result = genai.embed_content(
-            model=self.model,
-            content=text,
-            task_type="retrieval_query"
+        cache_key = make_cache_key(self.model, "retrieval_query", text)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        result = await self.resilience.call(
+            lambda: genai.embed_content_async(
+                model=self.model,
+                content=text,
+                task_type="retrieval_query"
+            )
         )
+        self.cache.set(cache_key, result["embedding"])
         return result["embedding"]
 
     def get_embedding_dimension(self) -> int:
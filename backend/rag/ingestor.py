@@ -1,12 +1,25 @@
-from typing import List, Dict
+from dataclasses import dataclass
+from typing import List, Dict, Optional
 from qdrant_client import QdrantClient
 from qdrant_client.models import PointStruct
 from rag.embedder import Embedder
-from rag.chunker import Chunker, ChunkingConfig
+from rag.chunker import Chunker, ChunkIndex, ChunkingConfig
+from rag.dedup import NearDuplicateFilter
 from utils.file_loader import load_markdown_files
+from utils.qdrant_client import DUPLICATE_LIST_FIELDS
+from utils.response_cache import CollectionVersions
 import uuid
 
 
+@dataclass
+class IngestResult:
+    """Summary of an ingestion run."""
+
+    chunks_ingested: int
+    duplicates_skipped: int = 0
+    storage_bytes_saved: int = 0
+
+
 class Ingestor:
     """Handles document ingestion pipeline."""
 
@@ -16,6 +29,8 @@ class Ingestor:
         embedder: Embedder,
         chunking_config: ChunkingConfig,
         collection_name: str,
+        versions=None,
+        dedup: Optional[NearDuplicateFilter] = None,
     ):
         """
         Initialize the ingestor.
@@ -25,13 +40,24 @@ class Ingestor:
             embedder: Embedder instance
             chunking_config: Chunking configuration
             collection_name: Target collection name
+            versions: Collection version store; should outlive this ingestor, since an
+                ingest must invalidate answers cached through any later handle.
+                A private store is created if None
+            dedup: Near-duplicate filter applied before embedding; disabled if None
         """
         self.client = qdrant_client
         self.embedder = embedder
         self.chunker = Chunker(chunking_config)
         self.collection_name = collection_name
+        self.versions = versions if versions is not None else CollectionVersions()
+        self.dedup = dedup
 
-    async def ingest_documents(self, docs_path: str) -> int:
+    @property
+    def collection_version(self) -> int:
+        """Version bumped on every ingest so caches keyed on it are invalidated."""
+        return self.versions.get(self.collection_name)
+
+    async def ingest_documents(self, docs_path: str) -> IngestResult:
         """
         Ingest documents from a directory.
 
@@ -39,7 +65,7 @@ class Ingestor:
             docs_path: Path to the documents directory
 
         Returns:
-            Number of chunks ingested
+            IngestResult with chunk counts and deduplication savings
         """
         # Load markdown files
         files = load_markdown_files(docs_path, extensions=[".md", ".mdx"])
@@ -47,29 +73,47 @@ class Ingestor:
         if not files:
             raise ValueError(f"No markdown files found in {docs_path}")
 
-        # Process all files
-        all_chunks = []
+        # Process all files into chunk offsets
+        index = ChunkIndex()
         for file_info in files:
-            chunks = self._process_file(file_info)
-            all_chunks.extend(chunks)
+            self._process_file(file_info, index)
 
-        if not all_chunks:
+        if not len(index):
             raise ValueError("No chunks generated from files")
 
+        # Drop near-duplicate chunks before paying to embed and store them
+        result = IngestResult(chunks_ingested=len(index))
+        locations: Dict[int, List[Dict]] = {}
+        if self.dedup is not None:
+            deduped = self.dedup.filter(index)
+            index, locations = deduped.index, deduped.locations
+            vector_bytes = 4 * self.embedder.get_embedding_dimension()
+            result = IngestResult(
+                chunks_ingested=len(index),
+                duplicates_skipped=deduped.duplicates_removed,
+                storage_bytes_saved=deduped.text_bytes_saved
+                + deduped.duplicates_removed * vector_bytes,
+            )
+
         # Upload chunks to Qdrant
-        await self._upload_chunks(all_chunks)
+        try:
+            await self._upload_chunks(index, locations)
+        finally:
+            # Even a partial upload changes what queries can retrieve
+            self.versions.bump(self.collection_name)
 
-        return len(all_chunks)
+        return result
 
-    def _process_file(self, file_info: Dict) -> List[Dict]:
+    def _process_file(self, file_info: Dict, index: ChunkIndex) -> int:
         """
         Process a single file into chunks.
 
         Args:
             file_info: Dictionary with file_path, relative_path, and content
+            index: Chunk index to add the file's chunks to
 
         Returns:
-            List of chunk dictionaries
+            Number of chunks added
         """
         file_path = file_info["file_path"]
         content = file_info["content"]
@@ -77,38 +121,86 @@ class Ingestor:
 
         # Extract metadata
         metadata = self.chunker.extract_metadata(file_path, content)
-        metadata["relative_path"] = relative_path
+        metadata["relative_path"] = relative_path.replace("\\", "/")
+        metadata["path_prefixes"] = self._path_prefixes(metadata["relative_path"])
 
         # Chunk the content
-        chunks = self.chunker.chunk_text(content, metadata)
+        return self.chunker.index_text(index, content, metadata)
 
-        return chunks
+    @staticmethod
+    def _path_prefixes(relative_path: str) -> List[str]:
+        """
+        List every directory prefix of a path so prefix filters become exact matches.
+
+        Args:
+            relative_path: Forward-slash separated path relative to the docs root
 
-    async def _upload_chunks(self, chunks: List[Dict]):
+        Returns:
+            Prefixes such as ["guide", "guide/setup"] for "guide/setup/install.md"
         """
-        Upload chunks to Qdrant.
+        parts = relative_path.split("/")[:-1]
+        return ["/".join(parts[: i + 1]) for i in range(len(parts))]
+
+    @classmethod
+    def _merge_locations(cls, metadata: Dict, duplicates: List[Dict]) -> Dict:
+        """
+        Make a kept chunk filterable by the locations of its dropped duplicates.
 
         Args:
-            chunks: List of chunk dictionaries
+            metadata: Metadata of the kept chunk
+            duplicates: Locations of the near-duplicates dropped in its favor
+
+        Returns:
+            Metadata with list fields holding every copy's chapter, section and
+            relative path, and the union of their path prefixes
         """
-        # Extract texts for embedding
-        texts = [chunk["text"] for chunk in chunks]
-
-        # Generate embeddings
-        embeddings = self.embedder.embed_texts(texts)
-
-        # Create points for Qdrant
-        points = []
-        for chunk, embedding in zip(chunks, embeddings):
-            point = PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding,
-                payload={"text": chunk["text"], "metadata": chunk["metadata"]},
+        merged = dict(metadata)
+        copies = [metadata, *duplicates]
+        for field_name, list_field in DUPLICATE_LIST_FIELDS.items():
+            merged[list_field] = sorted(
+                {copy[field_name] for copy in copies if copy.get(field_name)}
             )
-            points.append(point)
+        prefixes = set(metadata.get("path_prefixes", []))
+        for duplicate in duplicates:
+            prefixes.update(cls._path_prefixes(duplicate.get("relative_path", "")))
+        merged["path_prefixes"] = sorted(prefixes)
+        return merged
+
+    async def _upload_chunks(
+        self,
+        index: ChunkIndex,
+        locations: Dict[int, List[Dict]],
+        batch_size: int = 100,
+    ):
+        """
+        Embed and upload chunks to Qdrant one batch at a time.
+
+        Chunk text, embeddings and points only exist for the batch in flight.
 
-        # Upload to Qdrant in batches
-        batch_size = 100
-        for i in range(0, len(points), batch_size):
-            batch = points[i : i + batch_size]
-            self.client.upsert(collection_name=self.collection_name, points=batch)
+        Args:
+            index: Chunk index to upload
+            locations: Other source locations of chunks that had near-duplicates
+            batch_size: Number of chunks embedded and upserted together
+        """
+        for start in range(0, len(index), batch_size):
+            texts = index.texts(start, start + batch_size)
+
+            # Generate embeddings
+            embeddings = await self.embedder.embed_texts(texts)
+
+            # Create points for Qdrant
+            points = []
+            for i, text, embedding in zip(
+                range(start, start + len(texts)), texts, embeddings
+            ):
+                payload = {"text": text, "metadata": index.chunk_metadata(i)}
+                if i in locations:
+                    payload["metadata"] = self._merge_locations(
+                        payload["metadata"], locations[i]
+                    )
+                    payload["duplicates"] = locations[i]
+                points.append(
+                    PointStruct(id=str(uuid.uuid4()), vector=embedding, payload=payload)
+                )
+
+            self.client.upsert(collection_name=self.collection_name, points=points)
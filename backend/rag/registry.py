@@ -0,0 +1,161 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from qdrant_client import QdrantClient
+from rag.chunker import ChunkingConfig
+from rag.dedup import NearDuplicateFilter
+from rag.embedder import Embedder
+from rag.ingestor import Ingestor
+from rag.retriever import Retriever
+from utils.qdrant_client import check_collection_exists, initialize_collection
+from utils.response_cache import CollectionVersions, ResponseCache
+from utils.shared_store import (
+    SharedCollectionVersions,
+    SharedResponseCache,
+    SharedStore,
+)
+
+
+class CollectionNotFound(Exception):
+    """Raised when a query targets a collection that has not been ingested."""
+
+
+@dataclass
+class CollectionHandle:
+    """Per-collection retriever, ingestor and caches."""
+
+    name: str
+    retriever: Retriever
+    ingestor: Ingestor
+    response_cache: ResponseCache
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class CollectionRegistry:
+    """Lazily created, LRU-evicted pool of per-collection components."""
+
+    def __init__(
+        self,
+        qdrant_client: QdrantClient,
+        embedder: Embedder,
+        chunking_config: ChunkingConfig,
+        max_collections: int = 32,
+        idle_seconds: float = 1800,
+        response_cache_size: int = 1024,
+        response_cache_ttl_seconds: float = 3600,
+        shared_store: Optional[SharedStore] = None,
+        dedup: Optional[NearDuplicateFilter] = None,
+    ):
+        """
+        Initialize the registry.
+
+        Args:
+            qdrant_client: Qdrant client shared by all collections
+            embedder: Embedder shared by all collections
+            chunking_config: Chunking configuration used for ingestion
+            max_collections: Maximum number of collections kept warm
+            idle_seconds: Idle time after which a collection's components are dropped
+            response_cache_size: Response cache size per collection
+            response_cache_ttl_seconds: Response cache TTL per collection
+            shared_store: Keep caches and collection versions here so all workers share them
+            dedup: Near-duplicate filter used when ingesting
+        """
+        self.client = qdrant_client
+        self.embedder = embedder
+        self.chunking_config = chunking_config
+        self.max_collections = max_collections
+        self.idle_seconds = idle_seconds
+        self.response_cache_size = response_cache_size
+        self.response_cache_ttl_seconds = response_cache_ttl_seconds
+        self.shared_store = shared_store
+        # Versions live here rather than on the evictable handles, so an ingest
+        # whose handle is evicted mid-run still invalidates answers cached
+        # through the handle that replaced it
+        self.versions = (
+            SharedCollectionVersions(shared_store) if shared_store else CollectionVersions()
+        )
+        self.dedup = dedup
+        self._handles: "OrderedDict[str, CollectionHandle]" = OrderedDict()
+
+    def get(self, name: str, create: bool = False) -> CollectionHandle:
+        """
+        Get the components for a collection, creating them on first use.
+
+        Args:
+            name: Collection name
+            create: Create the Qdrant collection if it does not exist
+
+        Returns:
+            CollectionHandle for the collection
+
+        Raises:
+            CollectionNotFound: If the collection does not exist and create is False
+        """
+        self._evict_idle()
+
+        handle = self._handles.get(name)
+        if handle is None:
+            if create:
+                initialize_collection(
+                    self.client, name, self.embedder.get_embedding_dimension()
+                )
+            elif not check_collection_exists(self.client, name):
+                raise CollectionNotFound(f"Collection not found: {name}")
+            handle = self._create_handle(name)
+            self._handles[name] = handle
+
+        handle.last_used = time.monotonic()
+        self._handles.move_to_end(name)
+
+        while len(self._handles) > self.max_collections:
+            self._handles.popitem(last=False)
+
+        return handle
+
+    def active_collections(self) -> List[str]:
+        """Return the names of collections currently held in memory."""
+        return list(self._handles)
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Return response cache counters per active collection."""
+        return {
+            name: handle.response_cache.metrics()
+            for name, handle in self._handles.items()
+        }
+
+    def _create_handle(self, name: str) -> CollectionHandle:
+        if self.shared_store is not None:
+            response_cache = SharedResponseCache(
+                self.shared_store,
+                namespace=name,
+                max_size=self.response_cache_size,
+                ttl_seconds=self.response_cache_ttl_seconds,
+            )
+        else:
+            response_cache = ResponseCache(
+                max_size=self.response_cache_size,
+                ttl_seconds=self.response_cache_ttl_seconds,
+            )
+
+        return CollectionHandle(
+            name=name,
+            retriever=Retriever(qdrant_client=self.client, collection_name=name),
+            ingestor=Ingestor(
+                qdrant_client=self.client,
+                embedder=self.embedder,
+                chunking_config=self.chunking_config,
+                collection_name=name,
+                versions=self.versions,
+                dedup=self.dedup,
+            ),
+            response_cache=response_cache,
+        )
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._handles:
+            oldest = next(iter(self._handles.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._handles.popitem(last=False)
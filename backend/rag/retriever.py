@@ -1,6 +1,13 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from qdrant_client import QdrantClient
-from qdrant_client.models import ScoredPoint
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    MatchValue,
+    ScoredPoint,
+    SearchRequest,
+)
+from utils.qdrant_client import DUPLICATE_LIST_FIELDS
 
 
 class Retriever:
@@ -18,7 +25,15 @@ class Retriever:
         self.collection_name = collection_name
 
     def search(
-        self, query_vector: List[float], top_k: int = 5, score_threshold: float = 0.2
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        score_threshold: float = 0.2,
+        chapter: Optional[str] = None,
+        section: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+        boost_path: Optional[str] = None,
+        boost: float = 0.1,
     ) -> List[Dict]:
         """
         Search for similar vectors in the collection.
@@ -27,28 +42,114 @@ class Retriever:
             query_vector: Query embedding vector
             top_k: Number of results to return
             score_threshold: Minimum similarity score
+            chapter: Only return chunks from this chapter
+            section: Only return chunks from this section
+            path_prefix: Only return chunks whose relative path is under this directory
+            boost_path: Relative path of the page the reader is on; its chunks are boosted
+            boost: Score added to chunks from boost_path
 
         Returns:
             List of search results with text, metadata, and scores
         """
-        search_results = self.client.search(
+        query_filter = self.build_filter(chapter, section, path_prefix)
+
+        if not boost_path:
+            search_results = self.client.search(
+                collection_name=self.collection_name,
+                query_vector=query_vector,
+                query_filter=query_filter,
+                limit=top_k,
+                score_threshold=score_threshold,
+            )
+            return [self._to_result(result) for result in search_results]
+
+        # Search the scope and the current page in one round trip, then merge
+        page_filter = self.build_filter(
+            chapter, section, path_prefix, relative_path=boost_path.replace("\\", "/")
+        )
+        scoped, on_page = self.client.search_batch(
             collection_name=self.collection_name,
-            query_vector=query_vector,
-            limit=top_k,
-            score_threshold=score_threshold,
+            requests=[
+                SearchRequest(
+                    vector=query_vector,
+                    filter=query_filter,
+                    limit=top_k,
+                    score_threshold=score_threshold,
+                    with_payload=True,
+                ),
+                SearchRequest(
+                    vector=query_vector,
+                    filter=page_filter,
+                    limit=top_k,
+                    score_threshold=score_threshold,
+                    with_payload=True,
+                ),
+            ],
         )
 
-        results = []
-        for result in search_results:
-            results.append(
-                {
-                    "text": result.payload.get("text", ""),
-                    "metadata": result.payload.get("metadata", {}),
-                    "score": result.score,
-                }
+        merged = {result.id: self._to_result(result) for result in scoped}
+        for result in on_page:
+            boosted = self._to_result(result)
+            boosted["score"] += boost
+            merged[result.id] = boosted
+
+        return sorted(merged.values(), key=lambda r: r["score"], reverse=True)[:top_k]
+
+    def build_filter(
+        self,
+        chapter: Optional[str] = None,
+        section: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+        relative_path: Optional[str] = None,
+    ) -> Optional[Filter]:
+        """
+        Build a Qdrant filter over indexed chunk metadata.
+
+        Args:
+            chapter: Exact chapter to match
+            section: Exact section to match
+            path_prefix: Directory the chunk's relative path must be under
+            relative_path: Exact relative path to match
+
+        Returns:
+            Filter, or None when no conditions are given
+        """
+        conditions = []
+        if chapter:
+            conditions.append(self._match_any_copy("chapter", chapter))
+        if section:
+            conditions.append(self._match_any_copy("section", section))
+        if path_prefix:
+            prefix = path_prefix.replace("\\", "/").strip("/")
+            conditions.append(
+                FieldCondition(key="metadata.path_prefixes", match=MatchValue(value=prefix))
             )
+        if relative_path:
+            conditions.append(self._match_any_copy("relative_path", relative_path))
+
+        if not conditions:
+            return None
+        return Filter(must=conditions)
+
+    @staticmethod
+    def _match_any_copy(field_name: str, value: str) -> Filter:
+        # Chunks kept for near-duplicates also list the other copies' values
+        return Filter(
+            should=[
+                FieldCondition(key=f"metadata.{field_name}", match=MatchValue(value=value)),
+                FieldCondition(
+                    key=f"metadata.{DUPLICATE_LIST_FIELDS[field_name]}",
+                    match=MatchValue(value=value),
+                ),
+            ]
+        )
 
-        return results
+    def _to_result(self, result: ScoredPoint) -> Dict:
+        return {
+            "text": result.payload.get("text", ""),
+            "metadata": result.payload.get("metadata", {}),
+            "score": result.score,
+        }
 
     def format_sources(self, results: List[Dict]) -> List[Dict]:
         """
@@ -0,0 +1,246 @@
+"""Export and restore ingested collections without re-embedding.
+
+A snapshot is a directory with three files:
+
+- ``manifest.json``: collection name, point count, vector size and dtype
+- ``vectors.bin``: all vectors as one contiguous row-major float16/float32 array
+- ``payloads.jsonl.zst``: one ``{"id", "payload"}`` line per point, zstd-compressed
+
+Usage:
+    python -m rag.snapshot export --collection ai_spec_driven_book --out snapshots/book
+    python -m rag.snapshot import --path snapshots/book
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import time
+from typing import Dict, Iterator, Optional
+import numpy as np
+import zstandard
+from qdrant_client import QdrantClient
+from utils.qdrant_client import initialize_collection
+from utils.shared_store import (
+    SharedCollectionVersions,
+    SharedStore,
+    default_store_path,
+)
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.bin"
+PAYLOADS_FILE = "payloads.jsonl.zst"
+FORMAT_VERSION = 1
+
+
+def export_snapshot(
+    client: QdrantClient,
+    collection_name: str,
+    output_dir: str,
+    dtype: str = "float16",
+    batch_size: int = 512,
+) -> Dict:
+    """
+    Stream every point of a collection into a snapshot directory.
+
+    Args:
+        client: Qdrant client instance
+        collection_name: Collection to export
+        output_dir: Directory to write the snapshot into
+        dtype: Vector storage type, "float16" or "float32"
+        batch_size: Number of points fetched per scroll request
+
+    Returns:
+        The snapshot manifest
+    """
+    if dtype not in ("float16", "float32"):
+        raise ValueError(f"Unsupported vector dtype: {dtype}")
+
+    vector_size = client.get_collection(collection_name).config.params.vectors.size
+    os.makedirs(output_dir, exist_ok=True)
+
+    count = 0
+    compressor = zstandard.ZstdCompressor(level=10, threads=-1)
+    with open(os.path.join(output_dir, VECTORS_FILE), "wb") as vectors_file, open(
+        os.path.join(output_dir, PAYLOADS_FILE), "wb"
+    ) as payloads_file, compressor.stream_writer(payloads_file) as payloads:
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if records:
+                vectors = np.asarray([record.vector for record in records], dtype=dtype)
+                vectors_file.write(vectors.tobytes())
+                for record in records:
+                    line = json.dumps(
+                        {"id": record.id, "payload": record.payload},
+                        ensure_ascii=False,
+                        separators=(",", ":"),
+                    )
+                    payloads.write(line.encode("utf-8") + b"\n")
+                count += len(records)
+            if offset is None:
+                break
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "collection": collection_name,
+        "count": count,
+        "vector_size": vector_size,
+        "dtype": dtype,
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def import_snapshot(
+    client: QdrantClient,
+    input_dir: str,
+    collection_name: Optional[str] = None,
+    batch_size: int = 256,
+    parallel: int = 4,
+    versions: Optional[SharedCollectionVersions] = None,
+) -> int:
+    """
+    Stream a snapshot back into Qdrant with parallel batched upserts.
+
+    Args:
+        client: Qdrant client instance
+        input_dir: Snapshot directory written by export_snapshot
+        collection_name: Target collection; defaults to the exported collection name
+        batch_size: Number of points per upsert
+        parallel: Number of concurrent upload workers
+        versions: Shared collection versions to bump so running workers drop
+            cached answers for the collection
+
+    Returns:
+        Number of points restored
+    """
+    manifest = read_manifest(input_dir)
+    collection_name = collection_name or manifest["collection"]
+    count = manifest["count"]
+
+    initialize_collection(client, collection_name, manifest["vector_size"])
+    if count == 0:
+        if versions is not None:
+            versions.bump(collection_name)
+        return 0
+
+    vectors = np.memmap(
+        os.path.join(input_dir, VECTORS_FILE),
+        dtype=manifest["dtype"],
+        mode="r",
+        shape=(count, manifest["vector_size"]),
+    )
+    ids, payloads = itertools.tee(iter_payloads(input_dir))
+
+    try:
+        client.upload_collection(
+            collection_name=collection_name,
+            vectors=(row.astype(np.float32).tolist() for row in vectors),
+            ids=(record["id"] for record in ids),
+            payload=(record["payload"] for record in payloads),
+            batch_size=batch_size,
+            parallel=parallel,
+            wait=True,
+        )
+    finally:
+        # Even a partial restore changes what queries can retrieve
+        if versions is not None:
+            versions.bump(collection_name)
+    return count
+
+
+def read_manifest(input_dir: str) -> Dict:
+    """
+    Read and validate a snapshot manifest.
+
+    Args:
+        input_dir: Snapshot directory
+
+    Returns:
+        The snapshot manifest
+    """
+    with open(os.path.join(input_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot format: {manifest.get('format_version')}"
+        )
+    return manifest
+
+
+def iter_payloads(input_dir: str) -> Iterator[Dict]:
+    """
+    Stream point IDs and payloads from a snapshot.
+
+    Args:
+        input_dir: Snapshot directory
+
+    Yields:
+        Dictionaries with id and payload
+    """
+    decompressor = zstandard.ZstdDecompressor()
+    with open(os.path.join(input_dir, PAYLOADS_FILE), "rb") as f:
+        with decompressor.stream_reader(f) as reader:
+            for line in io.TextIOWrapper(reader, encoding="utf-8"):
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or restore collection snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export a collection")
+    export_parser.add_argument("--collection", default=None)
+    export_parser.add_argument("--out", required=True)
+    export_parser.add_argument("--dtype", choices=["float16", "float32"], default="float16")
+
+    import_parser = commands.add_parser("import", help="Restore a snapshot")
+    import_parser.add_argument("--path", required=True)
+    import_parser.add_argument("--collection", default=None)
+    import_parser.add_argument("--batch-size", type=int, default=256)
+    import_parser.add_argument("--parallel", type=int, default=4)
+
+    args = parser.parse_args()
+
+    from config import settings
+    from utils.qdrant_client import get_qdrant_client
+
+    client = get_qdrant_client(settings.qdrant_url, settings.qdrant_api_key)
+    started = time.perf_counter()
+
+    if args.command == "export":
+        manifest = export_snapshot(
+            client, args.collection or settings.collection_name, args.out, args.dtype
+        )
+        print(f"Exported {manifest['count']} points to {args.out}", end="")
+    else:
+        versions = None
+        if settings.shared_cache_path or settings.workers > 1:
+            store = SharedStore(settings.shared_cache_path or default_store_path())
+            versions = SharedCollectionVersions(store)
+        count = import_snapshot(
+            client,
+            args.path,
+            args.collection,
+            args.batch_size,
+            args.parallel,
+            versions=versions,
+        )
+        print(f"Restored {count} points from {args.path}", end="")
+
+    print(f" in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,24 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
+from qdrant_client.models import Distance, PayloadSchemaType, VectorParams
+
+# Metadata fields used to scope searches; keyword-indexed at collection init
+INDEXED_PAYLOAD_FIELDS = [
+    "metadata.chapter",
+    "metadata.section",
+    "metadata.relative_path",
+    "metadata.path_prefixes",
+    "metadata.chapters",
+    "metadata.sections",
+    "metadata.relative_paths",
+]
+
+# A chunk kept for a group of near-duplicates lists every copy's value of these
+# fields, so filters match any copy's location
+DUPLICATE_LIST_FIELDS = {
+    "chapter": "chapters",
+    "section": "sections",
+    "relative_path": "relative_paths",
+}
 
 
 def get_qdrant_client(url: str, api_key: str) -> QdrantClient:
@@ -42,6 +61,25 @@ def initialize_collection(
     else:
         print(f"Collection {collection_name} already exists")
 
+    # Creating an existing index is a no-op, so older collections get them too
+    create_payload_indexes(client, collection_name)
+
+
+def create_payload_indexes(client: QdrantClient, collection_name: str) -> None:
+    """
+    Create keyword payload indexes for the metadata fields used in filters.
+
+    Args:
+        client: Qdrant client instance
+        collection_name: Name of the collection
+    """
+    for field_name in INDEXED_PAYLOAD_FIELDS:
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=PayloadSchemaType.KEYWORD,
+        )
+
 
 def check_collection_exists(client: QdrantClient, collection_name: str) -> bool:
     """
@@ -0,0 +1,282 @@
+"""Append-only query log with replay for load testing and cache pre-warming.
+
+Usage:
+    python -m utils.query_log replay --log queries.jsonl --url http://localhost:8000 [--speed 2.0]
+    python -m utils.query_log top --log queries.jsonl [--n 20]
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Request fields replayed for each endpoint
+REPLAY_FIELDS = {
+    "/query": (
+        "question",
+        "mode",
+        "top_k",
+        "collection",
+        "filters",
+        "current_page",
+        "session_id",
+    ),
+    "/query-selected": ("question", "selected_text"),
+}
+
+_STOP = object()
+
+
+class QueryLogWriter:
+    """Buffered JSONL writer that keeps file I/O off the request path."""
+
+    def __init__(self, path: str, max_buffer: int = 10000, flush_interval: float = 1.0):
+        """
+        Initialize the writer and start its background thread.
+
+        Args:
+            path: File the log is appended to
+            max_buffer: Entries buffered before new ones are dropped
+            flush_interval: Seconds the writer waits for entries before polling again
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_buffer)
+        self.written = 0
+        self.dropped = 0
+        self._closing = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="query-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def record(self, entry: Dict) -> None:
+        """
+        Queue an entry for writing without blocking.
+
+        Args:
+            entry: JSON-serializable log entry
+        """
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush buffered entries and stop the writer thread."""
+        self._closing.set()
+        try:
+            # Wakes the writer at once; with a full buffer it stops after draining
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+
+    def metrics(self) -> Dict[str, float]:
+        """Return write and drop counters."""
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "buffered": self._queue.qsize(),
+        }
+
+    def _run(self) -> None:
+        # Unbuffered appends write each batch in one call, so workers sharing
+        # a log file do not interleave partial lines
+        with open(self.path, "ab", buffering=0) as f:
+            while True:
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    if self._closing.is_set():
+                        return
+                    continue
+                while len(batch) < 1000:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                entries = [entry for entry in batch if entry is not _STOP]
+                f.write(
+                    "".join(
+                        json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries
+                    ).encode("utf-8")
+                )
+                self.written += len(entries)
+
+                if len(entries) != len(batch):
+                    return
+
+
+def read_query_log(path: str) -> Iterator[Dict]:
+    """
+    Read entries from a query log, skipping malformed lines.
+
+    Args:
+        path: Log file path
+
+    Yields:
+        Log entries in file order
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def replay_body(entry: Dict) -> Optional[Tuple[str, Dict]]:
+    """
+    Rebuild the request for a log entry.
+
+    Args:
+        entry: Log entry
+
+    Returns:
+        Tuple of (endpoint, request body), or None for unknown endpoints
+    """
+    fields = REPLAY_FIELDS.get(entry.get("endpoint"))
+    if fields is None:
+        return None
+    body = {field: entry[field] for field in fields if entry.get(field) is not None}
+    return entry["endpoint"], body
+
+
+def top_queries(path: str, n: int) -> List[Tuple[str, Dict]]:
+    """
+    Find the most frequent distinct requests in a log.
+
+    Args:
+        path: Log file path
+        n: Number of requests to return
+
+    Returns:
+        Up to n (endpoint, request body) pairs, most frequent first
+    """
+    counts: Counter = Counter()
+    for entry in read_query_log(path):
+        request = replay_body(entry)
+        if request is not None:
+            # Pre-warming answers statelessly, so sessions do not split the counts
+            request[1].pop("session_id", None)
+            counts[json.dumps(request, sort_keys=True)] += 1
+    return [tuple(json.loads(key)) for key, _ in counts.most_common(n)]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Value at a percentile (0-1) of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def replay(
+    path: str, base_url: str, speed: float = 1.0, concurrency: int = 32
+) -> Dict[str, float]:
+    """
+    Re-issue logged requests against a running instance.
+
+    Requests are sent at their original spacing divided by speed; a speed of
+    0 sends them as fast as the worker pool allows.
+
+    Args:
+        path: Log file path
+        base_url: Base URL of the instance under test
+        speed: Replay rate multiplier
+        concurrency: Maximum requests in flight
+
+    Returns:
+        Request counts, error counts and latency percentiles in milliseconds
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+
+    def send(endpoint: str, body: Dict) -> None:
+        request = urllib.request.Request(
+            base_url.rstrip("/") + endpoint,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = 0
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    first_ts = None
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for entry in read_query_log(path):
+            request = replay_body(entry)
+            if request is None:
+                continue
+            if speed > 0 and "ts" in entry:
+                if first_ts is None:
+                    first_ts = entry["ts"]
+                wait = (entry["ts"] - first_ts) / speed - (time.perf_counter() - started)
+                if wait > 0:
+                    time.sleep(wait)
+            pool.submit(send, *request)
+    duration = time.perf_counter() - started
+
+    total = sum(statuses.values())
+    return {
+        "requests": total,
+        "errors": total - statuses[200],
+        "duration_seconds": round(duration, 2),
+        "throughput_rps": round(total / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p90_ms": round(percentile(latencies, 0.90), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "statuses": dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and replay query logs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = commands.add_parser("replay", help="Replay a log against a server")
+    replay_parser.add_argument("--log", required=True)
+    replay_parser.add_argument("--url", default="http://localhost:8000")
+    replay_parser.add_argument(
+        "--speed", type=float, default=1.0, help="Rate multiplier; 0 sends as fast as possible"
+    )
+    replay_parser.add_argument("--concurrency", type=int, default=32)
+
+    top_parser = commands.add_parser("top", help="Show the most frequent requests")
+    top_parser.add_argument("--log", required=True)
+    top_parser.add_argument("--n", type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        report = replay(args.log, args.url, args.speed, args.concurrency)
+        print(json.dumps(report, indent=2))
+    else:
+        for endpoint, body in top_queries(args.log, args.n):
+            print(endpoint, json.dumps(body, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
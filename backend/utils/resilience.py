@@ -0,0 +1,303 @@
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from google.api_core import exceptions as core_exceptions
+
+T = TypeVar("T")
+
+# Upstream errors worth retrying; quota errors are excluded because retrying
+# them only deepens the overload
+TRANSIENT_ERRORS = (core_exceptions.ServerError, ConnectionError)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class RequestDeadlineExceeded(Exception):
+    """Raised when an upstream call cannot finish before the request deadline."""
+
+
+class CircuitOpenError(Exception):
+    """Raised when calls are short-circuited because an upstream is failing."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable")
+        self.retry_after = retry_after
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Set a deadline for all upstream calls made inside the block.
+
+    An enclosing deadline that is sooner is kept.
+
+    Args:
+        seconds: Time budget from now
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """
+    Time left before the current deadline.
+
+    Returns:
+        Seconds remaining, or None when no deadline is set
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after repeated failures, then probes for recovery."""
+
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            name: Upstream name used in errors
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: Time the circuit stays open before a probe is allowed
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.closed
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self) -> None:
+        """
+        Check whether a call may proceed.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if self.state == self.closed:
+            return
+
+        waited = time.monotonic() - self._opened_at
+        if self.state == self.open and waited >= self.reset_seconds:
+            self.state = self.half_open
+
+        if self.state == self.half_open and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+
+        raise CircuitOpenError(self.name, max(0.0, self.reset_seconds - waited))
+
+    def record_success(self) -> None:
+        self.state = self.closed
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.half_open or self._failures >= self.failure_threshold:
+            self.state = self.open
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Latency at a percentile of the window.
+
+        Args:
+            q: Percentile between 0 and 1
+
+        Returns:
+            Latency in seconds, or None until enough samples are collected
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientCaller:
+    """Deadlines, jittered retries, hedging and a circuit breaker for one upstream."""
+
+    def __init__(
+        self,
+        name: str,
+        max_retries: int = 2,
+        backoff_base_seconds: float = 0.2,
+        backoff_max_seconds: float = 2.0,
+        hedge: bool = False,
+        hedge_delay_seconds: float = 1.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30,
+    ):
+        """
+        Initialize the caller.
+
+        Args:
+            name: Upstream name used in errors and metrics
+            max_retries: Retries after the first attempt for transient errors
+            backoff_base_seconds: Base of the exponential backoff
+            backoff_max_seconds: Cap on a single backoff delay
+            hedge: Send a duplicate request when the first one is slower than p95
+            hedge_delay_seconds: Hedge delay used until a p95 is available
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: Time the circuit stays open before a probe is allowed
+        """
+        self.name = name
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.hedge = hedge
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_seconds)
+        self.latency = LatencyTracker()
+
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        self.deadline_exceeded = 0
+
+    async def call(
+        self, fn: Callable[[], Awaitable[T]], hedge: Optional[bool] = None
+    ) -> T:
+        """
+        Run an upstream call with retries, hedging and the circuit breaker.
+
+        Args:
+            fn: Factory returning a fresh awaitable for each attempt
+            hedge: Override whether this call may be hedged
+
+        Returns:
+            Result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the upstream is short-circuited
+            RequestDeadlineExceeded: If the request deadline expires
+        """
+        hedge = self.hedge if hedge is None else hedge
+        self.calls += 1
+        attempt = 0
+
+        while True:
+            self.breaker.before_call()
+            try:
+                result = await self._attempt(fn, hedge)
+            except TRANSIENT_ERRORS:
+                self.breaker.record_failure()
+                attempt += 1
+                delay = random.uniform(
+                    0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2**attempt)
+                )
+                remaining = remaining_time()
+                if attempt > self.max_retries or (
+                    remaining is not None and delay >= remaining
+                ):
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            except RequestDeadlineExceeded:
+                self.breaker.record_failure()
+                self.deadline_exceeded += 1
+                raise
+            except BaseException:
+                # Not an upstream health problem; let another call probe instead
+                self.breaker.release_probe()
+                raise
+
+            self.breaker.record_success()
+            return result
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]], hedge: bool) -> T:
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise RequestDeadlineExceeded(f"Deadline exceeded before calling {self.name}")
+
+        try:
+            return await asyncio.wait_for(self._race(fn, hedge), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise RequestDeadlineExceeded(f"Deadline exceeded waiting for {self.name}")
+
+    async def _race(self, fn: Callable[[], Awaitable[T]], hedge: bool) -> T:
+        started = time.monotonic()
+        primary = asyncio.ensure_future(fn())
+        backup = None
+        try:
+            if not hedge:
+                return await primary
+
+            delay = self.latency.percentile(0.95) or self.hedge_delay_seconds
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.hedges += 1
+            backup = asyncio.ensure_future(fn())
+            pending = {primary, backup}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.hedge_wins += 1
+                        return task.result()
+            return primary.result()
+        finally:
+            # The primary's elapsed time, even when cut short, keeps the tail visible
+            self.latency.record(time.monotonic() - started)
+            for task in (primary, backup):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def metrics(self) -> Dict[str, float]:
+        """Return call, retry and hedging counters for this upstream."""
+        p95 = self.latency.percentile(0.95)
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "deadline_exceeded": self.deadline_exceeded,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": round(self.hedges / self.calls, 4) if self.calls else 0.0,
+            "hedge_win_rate": round(self.hedge_wins / self.hedges, 4) if self.hedges else 0.0,
+            "p95_seconds": round(p95, 4) if p95 is not None else 0.0,
+            "circuit_open": float(self.breaker.state != CircuitBreaker.closed),
+        }
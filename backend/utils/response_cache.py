@@ -0,0 +1,185 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question so trivially different spellings share a cache key.
+
+    Args:
+        question: Raw question text
+
+    Returns:
+        Lower-cased question with collapsed whitespace
+    """
+    return " ".join(question.lower().split())
+
+
+def hash_text(text: str) -> str:
+    """
+    Hash arbitrary text into a short hex digest.
+
+    Args:
+        text: Text to hash
+
+    Returns:
+        SHA-256 hex digest
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(*parts: Any) -> str:
+    """
+    Build a cache key from its parts.
+
+    Args:
+        parts: Values that together identify a response
+
+    Returns:
+        Hex digest of the joined parts
+    """
+    return hash_text("\x1f".join(str(part) for part in parts))
+
+
+class ResponseCache:
+    """Exact-match response cache with TTL expiry and LRU eviction."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept before evicting the oldest
+            ttl_seconds: Lifetime of an entry in seconds
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[Dict, str]]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Tuple of (response payload, etag), or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, payload, etag = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload, etag
+
+    def set(self, key: str, payload: Dict) -> str:
+        """
+        Store a response payload.
+
+        Args:
+            key: Cache key
+            payload: JSON-serializable response body
+
+        Returns:
+            ETag computed for the payload
+        """
+        etag = self.compute_etag(payload)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, payload, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return etag
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, float]:
+        """Return hit/miss counters and current size."""
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def compute_etag(payload: Dict) -> str:
+        """
+        Compute a strong ETag for a response payload.
+
+        Args:
+            payload: JSON-serializable response body
+
+        Returns:
+            Quoted ETag string
+        """
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return f'"{hash_text(body)[:32]}"'
+
+
+class CollectionVersions:
+    """In-process collection versions, bumped on every ingest to invalidate cached answers."""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    def bump(self, name: str) -> int:
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            return self._versions[name]
+
+
+class EmbeddingCache:
+    """In-process LRU cache of query embeddings."""
+
+    def __init__(self, max_size: int = 10000):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum vectors kept before evicting the least recently used
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[List[float]]:
+        vector = self._entries.get(key)
+        if vector is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return vector
+
+    def set(self, key: str, vector: List[float]) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def metrics(self) -> Dict[str, float]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
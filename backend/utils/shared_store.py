@@ -0,0 +1,305 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from utils.response_cache import ResponseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS responses_expiry ON responses (namespace, expires_at);
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    vector BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS collection_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS claims (
+    name TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def default_store_path() -> str:
+    """
+    Pick a location for the shared store, preferring memory-backed /dev/shm.
+
+    Returns:
+        Path to the SQLite database file
+    """
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp"
+    return os.path.join(directory, "book-rag-cache.sqlite")
+
+
+class SharedStore:
+    """SQLite database shared by all worker processes on a host."""
+
+    def __init__(self, path: str, busy_timeout: float = 0.05):
+        """
+        Open the store, creating its schema if needed.
+
+        Args:
+            path: Database file; put it on tmpfs (/dev/shm) to keep it in shared memory
+            busy_timeout: Seconds a write waits for another worker's lock; calls run
+                on the event loop, so this is kept short and caches skip busy writes
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+        with self._lock:
+            self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so each process opens its own
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(
+                self.path,
+                isolation_level=None,
+                check_same_thread=False,
+                timeout=self.busy_timeout,
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Cache contents can be rebuilt, so durability is traded for speed
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._pid = os.getpid()
+        return self._conn
+
+    def execute(
+        self, sql: str, params: Tuple = (), busy_timeout: Optional[float] = None
+    ) -> List[Tuple]:
+        """
+        Run a statement and return all rows.
+
+        Args:
+            sql: SQL statement
+            params: Statement parameters
+            busy_timeout: Override the lock wait for writes that must not be skipped
+
+        Returns:
+            Result rows
+
+        Raises:
+            sqlite3.OperationalError: If the database stays locked past the timeout
+        """
+        with self._lock:
+            conn = self._connection()
+            if busy_timeout is None:
+                return conn.execute(sql, params).fetchall()
+            conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+            try:
+                return conn.execute(sql, params).fetchall()
+            finally:
+                conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+
+    def claim(self, name: str, ttl_seconds: float) -> bool:
+        """
+        Claim a named one-off task so only one worker performs it.
+
+        Args:
+            name: Task name
+            ttl_seconds: How long the claim blocks other workers
+
+        Returns:
+            True if this process won the claim
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            try:
+                conn.execute(
+                    "DELETE FROM claims WHERE name = ? AND expires_at < ?", (name, now)
+                )
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO claims VALUES (?, ?)", (name, now + ttl_seconds)
+                )
+            except sqlite3.OperationalError:
+                # Another worker is writing, most likely claiming the same task
+                return False
+            return cursor.rowcount == 1
+
+
+class SharedResponseCache(ResponseCache):
+    """Response cache stored in a SharedStore so every worker sees the same entries."""
+
+    def __init__(
+        self,
+        store: SharedStore,
+        namespace: str,
+        max_size: int = 1024,
+        ttl_seconds: float = 3600,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            store: Shared store holding the entries
+            namespace: Keeps entries of different collections apart
+            max_size: Maximum entries in this namespace before the oldest are evicted
+            ttl_seconds: Lifetime of an entry in seconds
+        """
+        super().__init__(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.store = store
+        self.namespace = namespace
+        self.skipped_writes = 0
+
+    def get(self, key: str) -> Optional[Tuple[Dict, str]]:
+        try:
+            rows = self.store.execute(
+                "SELECT payload, etag FROM responses"
+                " WHERE namespace = ? AND key = ? AND expires_at >= ?",
+                (self.namespace, key, time.time()),
+            )
+        except sqlite3.OperationalError:
+            rows = []
+        if not rows:
+            self.misses += 1
+            return None
+        self.hits += 1
+        payload, etag = rows[0]
+        return json.loads(payload), etag
+
+    def set(self, key: str, payload: Dict) -> str:
+        etag = self.compute_etag(payload)
+        try:
+            self.store.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (
+                    self.namespace,
+                    key,
+                    time.time() + self.ttl_seconds,
+                    json.dumps(payload),
+                    etag,
+                ),
+            )
+            # Trimming needs a count, so only do it on a sample of writes
+            if random.random() < 0.05:
+                self._evict()
+        except sqlite3.OperationalError:
+            # Another worker holds the write lock; skipping a cache write is
+            # cheaper than stalling the event loop
+            self.skipped_writes += 1
+        return etag
+
+    def clear(self) -> None:
+        self.store.execute("DELETE FROM responses WHERE namespace = ?", (self.namespace,))
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped_writes": self.skipped_writes,
+        }
+
+    def __len__(self) -> int:
+        return self.store.execute(
+            "SELECT COUNT(*) FROM responses WHERE namespace = ?", (self.namespace,)
+        )[0][0]
+
+    def _evict(self) -> None:
+        self.store.execute(
+            "DELETE FROM responses WHERE namespace = ? AND expires_at < ?",
+            (self.namespace, time.time()),
+        )
+        overflow = len(self) - self.max_size
+        if overflow > 0:
+            # Entries share one TTL, so the soonest to expire are the oldest
+            self.store.execute(
+                "DELETE FROM responses WHERE namespace = ? AND key IN ("
+                " SELECT key FROM responses WHERE namespace = ?"
+                " ORDER BY expires_at LIMIT ?)",
+                (self.namespace, self.namespace, overflow),
+            )
+
+
+class SharedEmbeddingCache:
+    """Query embedding cache stored as float32 blobs in a SharedStore."""
+
+    def __init__(self, store: SharedStore, max_size: int = 10000):
+        """
+        Initialize the cache.
+
+        Args:
+            store: Shared store holding the vectors
+            max_size: Maximum vectors kept before the oldest are evicted
+        """
+        self.store = store
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.skipped_writes = 0
+
+    def get(self, key: str) -> Optional[List[float]]:
+        try:
+            rows = self.store.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            )
+        except sqlite3.OperationalError:
+            rows = []
+        if not rows:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return np.frombuffer(rows[0][0], dtype=np.float32).tolist()
+
+    def set(self, key: str, vector: List[float]) -> None:
+        try:
+            self.store.execute(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                (key, time.time(), np.asarray(vector, dtype=np.float32).tobytes()),
+            )
+            if random.random() < 0.01:
+                self.store.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY created_at DESC"
+                    " LIMIT -1 OFFSET ?)",
+                    (self.max_size,),
+                )
+        except sqlite3.OperationalError:
+            self.skipped_writes += 1
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped_writes": self.skipped_writes,
+        }
+
+
+class SharedCollectionVersions:
+    """Collection versions shared across workers so an ingest invalidates every cache."""
+
+    def __init__(self, store: SharedStore):
+        self.store = store
+
+    def get(self, name: str) -> int:
+        rows = self.store.execute(
+            "SELECT version FROM collection_versions WHERE name = ?", (name,)
+        )
+        return rows[0][0] if rows else 0
+
+    def bump(self, name: str) -> int:
+        # Skipping a bump would leave stale answers cached, so wait for the lock
+        self.store.execute(
+            "INSERT INTO collection_versions VALUES (?, 1)"
+            " ON CONFLICT(name) DO UPDATE SET version = version + 1",
+            (name,),
+            busy_timeout=5,
+        )
+        return self.get(name)